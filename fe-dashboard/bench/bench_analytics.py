@@ -0,0 +1,113 @@
+# 学習分析エンジン (learning_analytics) のベンチマーク
+#   python bench/bench_analytics.py --rows 1000000 --append 1000
+# full:    全件からの初回構築
+# append:  追記された行だけを加算して全ビューを作り直す (ダッシュボードの再取得時)
+# pandas:  全件の DataFrame から毎回集計し直す場合 (比較用)
+# 結果は Snowflake スタンドインの集計ビューと一致することも確認する
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import snowflake_standin  # noqa: E402
+from learning_analytics import LearningAnalytics  # noqa: E402
+
+
+def all_views(analytics, exam_term):
+    return {
+        "exam_term_stats": analytics.exam_term_stats(exam_term),
+        "monthly_overview": analytics.monthly_overview(),
+        "exam_term_summary": analytics.exam_term_summary(),
+        "rolling_accuracy": analytics.rolling_accuracy(),
+        "mastery": analytics.mastery(),
+        "weak_topics": analytics.weak_topics(),
+    }
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 1), result
+
+
+def appended(detail, rows, seed):
+    # 既存の最新時刻より後の回答を rows 行追加
+    extra = snowflake_standin.dashboard_tables(rows, seed)["QUESTION_DETAIL_WITH_ATTEMPT"]
+    latest = pd.Timestamp(detail["ANSWERED_AT"].max())
+    shifted = pd.to_datetime(extra["ANSWERED_AT"]) - pd.Timestamp("2024-01-01") + latest + pd.Timedelta(seconds=1)
+    extra["ANSWERED_AT"] = shifted.dt.strftime("%Y-%m-%d %H:%M:%S")
+    return extra
+
+
+def check(views, tables, exam_term):
+    # スタンドインのビュー (pandas で集計したもの) と同じ結果になること
+    expected = tables["EXAM_TERM_ATTEMPT_STATS"]
+    expected = expected[expected["EXAM_TERM"] == exam_term].reset_index(drop=True)
+    pd.testing.assert_frame_equal(views["exam_term_stats"], expected, check_dtype=False)
+    pd.testing.assert_frame_equal(views["monthly_overview"], tables["MONTHLY_OVERVIEW"], check_dtype=False)
+    pd.testing.assert_frame_equal(views["exam_term_summary"], tables["EXAM_TERM_ATTEMPT_SUMMARY"], check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--append", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tables = snowflake_standin.dashboard_tables(args.rows)
+    detail = tables["QUESTION_DETAIL_WITH_ATTEMPT"]
+    exam_term = detail["EXAM_TERM"].iloc[0]
+    base = pa.Table.from_pandas(detail, preserve_index=False)
+    extra = pa.Table.from_pandas(appended(detail, args.append, seed=1), preserve_index=False)
+    grown = pa.concat_tables([base, extra])
+    results = {"rows": args.rows, "append_rows": args.append}
+
+    def full():
+        analytics = LearningAnalytics()
+        analytics.sync(base)
+        return analytics
+
+    results["full_ms"], analytics = timed(full, args.repeat)
+    check(all_views(analytics, exam_term), tables, exam_term)
+    results["views_ms"], _ = timed(lambda: all_views(analytics, exam_term), args.repeat)
+
+    def append():
+        analytics = full()
+        start = time.perf_counter()
+        analytics.sync(grown)
+        views = all_views(analytics, exam_term)
+        return time.perf_counter() - start, analytics, views
+
+    best = min((append() for _ in range(args.repeat)), key=lambda r: r[0])
+    results["append_and_views_ms"] = round(best[0] * 1000, 1)
+    assert best[1].snapshot()["appends"] == 1
+    rebuilt = LearningAnalytics()
+    rebuilt.sync(grown)
+    for name, view in all_views(rebuilt, exam_term).items():
+        pd.testing.assert_frame_equal(best[2][name], view, check_dtype=False, obj=name)
+
+    def pandas_views():
+        # スタンドインと同じ集計を全件から毎回行う
+        return snowflake_standin.aggregate_views(detail)
+
+    results["pandas_recompute_ms"], _ = timed(pandas_views, args.repeat)
+    results["groups"] = analytics.snapshot()["groups"]
+    print(json.dumps(results))
+    print(best[2]["weak_topics"].to_string(index=False))
+    assert np.isfinite(best[2]["mastery"]["MASTERY"]).all()
+
+
+if __name__ == "__main__":
+    main()
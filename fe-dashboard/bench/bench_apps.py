@@ -0,0 +1,205 @@
+# dashboard.py / epl.py を AppTest でヘッドレス実行するベンチマーク (Snowflake はローカルのスタンドイン)
+#   python bench/bench_apps.py --dashboard-rows 10000,100000 --epl-rows 100,2000 --output bench_apps.json
+# 起動時間・操作ごとの再実行時間・キャッシュ効率・ピークメモリを JSON で出力する
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import snowflake_standin  # noqa: E402
+
+DASHBOARD_PAGES = ["1. 試験回ごとの正解率", "2. 月別 学習サマリー", "3. 問題別 学習履歴", "4. 試験回の概要"]
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+class Session:
+    """1つの AppTest セッションでの操作と、操作ごとの再実行時間の記録"""
+
+    def __init__(self, script, secrets, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+        for section, values in secrets.items():
+            self.at.secrets[section] = values
+        self.steps = []
+
+    def step(self, name, action=None):
+        start = time.perf_counter()
+        if action is None:
+            self.at.run()
+        else:
+            action(self.at).run()
+        elapsed = time.perf_counter() - start
+        errors = [str(e.value) for e in self.at.exception] + [e.value for e in self.at.error]
+        self.steps.append({"step": name, "ms": round(elapsed * 1000, 1), "errors": errors})
+        if errors:
+            raise RuntimeError(f"{name}: {errors}")
+
+    def summary(self):
+        reruns = [s["ms"] for s in self.steps[1:]]
+        return {
+            "cold_start_ms": self.steps[0]["ms"],
+            "rerun_ms_mean": round(sum(reruns) / len(reruns), 1) if reruns else None,
+            "rerun_ms_max": max(reruns) if reruns else None,
+            "steps": self.steps,
+        }
+
+
+def run_dashboard(cache_dir, timeout):
+    session = Session("dashboard.py", {
+        "snowflake": snowflake_standin.secrets(),
+        "result_cache": {"directory": cache_dir},
+    }, timeout)
+    session.step("cold start")
+    for rep in ("cold", "warm"):
+        for page in DASHBOARD_PAGES[1:] + DASHBOARD_PAGES[:1]:
+            session.step(f"{rep}: {page}", lambda at, page=page: widget(at.sidebar.radio, "表示するページを選択").set_value(page))
+            if page == DASHBOARD_PAGES[0]:
+                session.step(f"{rep}: 試験回を変更", lambda at: at.selectbox[0].set_value(at.selectbox[0].options[-1]))
+        session.step(f"{rep}: {DASHBOARD_PAGES[2]}",
+                     lambda at: widget(at.sidebar.radio, "表示するページを選択").set_value(DASHBOARD_PAGES[2]))
+        session.step(f"{rep}: 問題別の試験回を変更", lambda at: at.selectbox[0].set_value(at.selectbox[0].options[-1]))
+
+    from query_trace import get_query_log
+
+    traces = get_query_log().recent()
+    requests = Counter(t["cache"] for t in traces if t["kind"] == "request")
+    loads = Counter(t.get("cache") for t in traces if t["kind"] == "load")
+    total = sum(requests.values())
+    return session.summary(), {"cache": {
+        "requests": dict(requests),
+        "loads": dict(loads),
+        "memory_hit_rate": round(requests["memory"] / total, 3) if total else None,
+    }}
+
+
+def run_epl(timeout):
+    os.environ["EPL_DATA_SOURCE"] = "snowflake"
+    os.environ["EPL_PROFILE"] = "1"  # 送信バイト数の計測
+    session = Session("epl.py", {"snowflake": snowflake_standin.secrets()}, timeout)
+    session.step("cold start")
+    session.step("rerun (変更なし)")
+    session.step("ソート順序", lambda at: widget(at.radio, "ソート順序:").set_value("昇順"))
+    session.step("ソート基準", lambda at: widget(at.selectbox, "ソート基準:").set_value("勝ち点"))
+    session.step("チーム詳細", lambda at: (lambda box: box.set_value(box.options[-1]))(widget(at.selectbox, "チームを選択:")))
+    session.step("シーズン絞り込み",
+                 lambda at: (lambda box: box.set_value(box.value[:5]))(widget(at.sidebar.multiselect, "シーズンを選択:")))
+    session.step("シーズンを戻す",
+                 lambda at: (lambda box: box.set_value(box.options[:10]))(widget(at.sidebar.multiselect, "シーズンを選択:")))
+
+    # epl_profile が記録したスクリプト全体の送信量 (操作ごと)
+    profile = session.at.session_state["rerun_profile"] if "rerun_profile" in session.at.session_state else []
+    return session.summary(), {
+        "forward_msg_bytes": [p["bytes"] for p in profile if p["scope"] == "script"][-len(session.steps):],
+    }
+
+
+def worker(app, rows, latency, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "standin.sqlite")
+        start = time.perf_counter()
+        if app == "dashboard":
+            snowflake_standin.build_database(db, dashboard_rows=rows)
+        else:
+            snowflake_standin.build_database(db, dashboard_rows=1, epl_rows=rows)
+        build_s = time.perf_counter() - start
+        rss_base = max_rss_mb()
+        stats = snowflake_standin.install(db, latency=latency)
+        if app == "dashboard":
+            timings, extra = run_dashboard(os.path.join(tmp, "results"), timeout)
+        else:
+            timings, extra = run_epl(timeout)
+        return {
+            "app": app,
+            "rows": rows,
+            "latency_s": latency,
+            "build_db_s": round(build_s, 2),
+            **{k: v for k, v in timings.items() if k != "steps"},
+            **extra,
+            "warehouse": stats.snapshot(),
+            "peak_rss_mb": round(max_rss_mb(), 1),
+            "peak_rss_delta_mb": round(max_rss_mb() - rss_base, 1),
+            "steps": timings["steps"],
+        }
+
+
+def meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import pandas
+    import pyarrow
+    import streamlit
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "streamlit": streamlit.__version__,
+        "pandas": pandas.__version__,
+        "pyarrow": pyarrow.__version__,
+    }
+
+
+def sizes(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apps", default="dashboard,epl")
+    parser.add_argument("--dashboard-rows", type=sizes, default=[10_000, 100_000])
+    parser.add_argument("--epl-rows", type=sizes, default=[100, 2_000])
+    parser.add_argument("--latency", type=float, default=0.05, help="スタンドインのクエリ1本あたりの遅延 (秒)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", default="bench_apps.json")
+    parser.add_argument("--worker", nargs=2, metavar=("APP", "ROWS"))
+    args = parser.parse_args()
+
+    if args.worker:
+        app, rows = args.worker
+        print(json.dumps(worker(app, int(rows), args.latency, args.timeout), ensure_ascii=False))
+        return
+
+    # キャッシュとピークRSSを分離するため、アプリ・データ量ごとに別プロセスで実行
+    results = []
+    for app in args.apps.split(","):
+        for rows in args.dashboard_rows if app == "dashboard" else args.epl_rows:
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", app, str(rows),
+                 "--latency", str(args.latency), "--timeout", str(args.timeout)],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{app:9} rows={rows:>9,} cold={result['cold_start_ms']:>8.1f}ms "
+                  f"rerun mean={result['rerun_ms_mean']:>7.1f}ms max={result['rerun_ms_max']:>8.1f}ms "
+                  f"queries={result['warehouse']['queries']:>3} peak_rss={result['peak_rss_mb']:.0f}MB")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta(), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
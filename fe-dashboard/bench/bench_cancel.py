@@ -0,0 +1,98 @@
+# 非同期投入したクエリの中止・タイムアウトの確認 (遅いビューを持つ Snowflake スタンドインを使う)
+#   python bench/bench_cancel.py --slow 3 --timeout 1 --leave-after 0.5
+# completed: 誰かが待っている取得は最後まで実行される
+# superseded: 待っていたセッションが離れた取得は、次の状態確認で abort_query される
+# prefetch: 待つセッションがいない事前取得は中止しない
+# timeout: ビューごとのタイムアウトを超えたクエリは abort_query して QueryTimeout になる
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import snowflake_standin  # noqa: E402
+from fetch import fetch_frame  # noqa: E402
+from query_control import QueryCancelled, QueryControl, QueryTimeout  # noqa: E402
+from refresher import Refresher  # noqa: E402
+from result_cache import cache_key  # noqa: E402
+from snowflake_pool import ConnectionPool  # noqa: E402
+
+SLOW_VIEW = "QUESTION_DETAIL_WITH_ATTEMPT"
+QUERY = f"SELECT * FROM {SLOW_VIEW}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--slow", type=float, default=3.0, help="遅いビューのクエリ1本あたりの秒数")
+    parser.add_argument("--timeout", type=float, default=1.0, help="遅いビューのステートメントタイムアウト")
+    parser.add_argument("--leave-after", type=float, default=0.5, help="セッションが待つのをやめるまでの秒数")
+    parser.add_argument("--poll", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "standin.sqlite")
+        snowflake_standin.build_database(db, args.rows, 1)
+        stats = snowflake_standin.StandInStats()
+        slow = {SLOW_VIEW: args.slow}
+        pool = ConnectionPool(lambda: snowflake_standin.StandInConnection(db, stats, slow=slow))
+        control = QueryControl(poll_interval=args.poll)
+
+        def load(refresh=False):
+            key = cache_key(QUERY)
+            with control.loading(key):
+                table = pool.run(lambda conn: fetch_frame(conn, QUERY, as_arrow=True, execute=control.execute))
+            return table, time.time()
+
+        def scenario(name, waiter, expect):
+            refresher = Refresher(load)
+            key = cache_key(QUERY)
+            aborted = stats.aborted
+            start = time.perf_counter()
+            try:
+                outcome = waiter(refresher, key)
+            except (QueryCancelled, QueryTimeout) as e:
+                outcome = type(e).__name__
+            result = {
+                "scenario": name,
+                "outcome": outcome,
+                "seconds": round(time.perf_counter() - start, 3),
+                "aborted": stats.aborted - aborted,
+            }
+            print(json.dumps(result, ensure_ascii=False))
+            assert outcome == expect, result
+
+        def completed(refresher, key):
+            with control.waiting(key):
+                return f"{refresher.get(key).num_rows} rows"
+
+        def superseded(refresher, key):
+            # 待っていたセッションが再実行で離れる (st.rerun / ページ切替に相当)
+            with control.waiting(key):
+                future = refresher.prime(key)
+                time.sleep(args.leave_after)
+            left = time.perf_counter()
+            try:
+                future.result()
+            finally:
+                print(json.dumps({"cancel_latency_ms": round((time.perf_counter() - left) * 1000, 1)}))
+
+        def prefetch(refresher, key):
+            # 事前取得は誰も待っていないが、途中で中止しない
+            return f"{refresher.prime(key).result().num_rows} rows"
+
+        scenario("completed", completed, f"{args.rows} rows")
+        scenario("superseded", superseded, "QueryCancelled")
+        scenario("prefetch", prefetch, f"{args.rows} rows")
+
+        control.timeouts[SLOW_VIEW] = args.timeout
+        scenario("timeout", completed, "QueryTimeout")
+        print(json.dumps({"control": control.snapshot(), "warehouse": stats.snapshot()}))
+
+
+if __name__ == "__main__":
+    main()
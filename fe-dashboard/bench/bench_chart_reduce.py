@@ -0,0 +1,45 @@
+# 描画用の間引き (chart_reduce) の速度 (極値が残ることは tests/test_chart_reduce.py で確認)
+#   python bench/bench_chart_reduce.py --rows 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chart_reduce  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--target", type=int, default=chart_reduce.DEFAULT_TARGET)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = np.arange(args.rows)
+    y = np.cumsum(rng.normal(size=args.rows))
+    y[rng.integers(0, args.rows)] += 500  # 1点だけのスパイク
+
+    for method in ("minmax", "lttb"):
+        start = time.perf_counter()
+        kept = chart_reduce.reduce_indices(x, y, args.target, method)
+        elapsed = time.perf_counter() - start
+        print(f"{method:>6}: {args.rows:,} -> {len(kept):,} points in {elapsed * 1000:.1f} ms"
+              f" (max kept: {y[kept].max() == y.max()})")
+
+    # 系列ごとの間引き
+    df = pd.DataFrame({"x": np.tile(x[: args.rows // 4], 4), "y": y[: args.rows // 4 * 4],
+                       "team": np.repeat(list("ABCD"), args.rows // 4)})
+    start = time.perf_counter()
+    reduced = chart_reduce.reduce_frame(df, "x", "y", args.target, by="team")
+    elapsed = time.perf_counter() - start
+    print(f"by team: {len(df):,} -> {len(reduced):,} rows in {elapsed * 1000:.1f} ms,"
+          f" render_mode={chart_reduce.render_mode(len(reduced))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# 集計エンジン (epl_aggregate.aggregate) と従来の個別集計の比較ベンチマーク
+#   python bench/bench_epl_aggregate.py --rows 100000
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import epl_aggregate  # noqa: E402
+import epl_data  # noqa: E402
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = [f"Club {i}" for i in range(40)]
+    players = [f"Player {i}" for i in range(2000)]
+    keepers = [f"Keeper {i}" for i in range(300)]
+    start = 3000 + np.arange(rows)
+    raw = pd.DataFrame({
+        "シーズン": [f"{y}-{(y + 1) % 100:02d}" for y in start[::-1]],
+        "優勝チーム": rng.choice(teams, rows),
+        "勝ち点": rng.integers(70, 101, rows),
+        "得点": rng.integers(60, 107, rows),
+        "失点": rng.integers(15, 45, rows),
+        "得点王": rng.choice(players, rows),
+        "得点王ゴール数": rng.integers(18, 37, rows),
+        "アシスト王": rng.choice(players, rows),
+        "アシスト数": rng.integers(10, 21, rows),
+        "クリーンシート王": rng.choice(keepers, rows),
+        "クリーンシート数": rng.integers(12, 25, rows),
+        "平均観客数": rng.integers(8000, 60000, rows),
+    })
+    return epl_data.compact_season_frame(raw)
+
+
+def scattered(df):
+    # 集計エンジン導入前の各タブ・サイドバーの個別計算
+    out = [len(df), df["得点"].mean(), df["勝ち点"].max(), df["平均観客数"].mean()]
+    for team in df["優勝チーム"].unique():
+        team_data = df[df["優勝チーム"] == team]
+        out += [len(team_data), team_data["勝ち点"].mean(), team_data["勝ち点"].max(),
+                team_data["得点"].mean(), team_data["失点"].mean(), team_data.iloc[0]["シーズン"],
+                team_data["得点"].max()]
+    for by, value in (("得点王", "得点王ゴール数"), ("クリーンシート王", "クリーンシート数")):
+        stats = df.groupby(by, observed=True).agg({value: ["sum", "mean", "count"]}).round(1)
+        out.append(stats.sort_values((value, "sum"), ascending=False))
+    out += [df["勝ち点"].max(), df["得点"].max(), df["失点"].min(), df["得点王ゴール数"].max(),
+            df.loc[df["得点王ゴール数"].idxmax(), "得点王"]]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    for name, func in (("scattered", scattered), ("aggregate", epl_aggregate.aggregate)):
+        best = min(timeit.repeat(lambda: func(df), number=1, repeat=args.repeat))
+        print(f"{name:>10}: {best * 1000:8.1f} ms  (rows={args.rows:,})")
+
+
+if __name__ == "__main__":
+    main()
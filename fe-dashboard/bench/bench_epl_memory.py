@@ -0,0 +1,28 @@
+# EPLデータの型変換によるメモリ削減量と、フィルタ・集計結果が変わらないことの確認
+#   python bench/bench_epl_memory.py --scale 1000
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "tests"))
+
+import epl_data  # noqa: E402
+from test_epl_data import check_same_results, scaled_seasons  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1000)
+    args = parser.parse_args()
+
+    raw = scaled_seasons(args.scale)
+    compact = epl_data.compact_season_frame(raw)
+    check_same_results(raw, compact)
+    before, after = epl_data.frame_memory(raw), epl_data.frame_memory(compact)
+    print(f"rows={len(raw):,} before={before:,}B after={after:,}B ({after / before:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# epl.py の起動時間ベンチマーク (import 時間と、新しいワーカーでの初回描画までの時間)
+#   python bench/bench_epl_startup.py --repeat 5
+# eager: 以前の epl.py と同じく plotly.express / graph_objects / make_subplots / numpy を先頭で import
+# lazy:  現在の epl.py (plotly は最初のチャート構築時に import)
+# fast:  lazy + EPL_FAST_START=1 (選択中のタブだけ描画)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+EPL_MODULES = ["streamlit", "epl_aggregate", "epl_cards", "epl_charts", "epl_data", "epl_profile", "epl_source", "epl_table"]
+EAGER_IMPORTS = ["plotly.express", "plotly.graph_objects", "plotly.subplots", "numpy", "pyarrow.parquet"]
+
+EAGER_SCRIPT = """\
+import sys
+sys.path.insert(0, {root!r})
+import plotly.express
+import plotly.graph_objects
+import plotly.subplots
+import numpy
+import pyarrow.parquet
+import runpy
+runpy.run_path({script!r})
+"""
+
+
+def import_profile(modules):
+    """-X importtime の出力から、トップレベルの import ごとの累積時間 (ms) を返す"""
+    code = f"import sys; sys.path.insert(0, {ROOT!r}); " + "; ".join(f"import {m}" for m in modules)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    top = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # 字下げなし (= 直接 import したモジュール) の行のみ集計
+        if not name[1:].startswith(" "):
+            top[name.strip()] = int(cumulative) / 1000
+    return top
+
+
+def first_paint(mode):
+    """新しいプロセスで epl.py を1回実行し、最初の要素・最初のチャート・完了までの時間 (ms) を測る"""
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    marks = {}
+    original = ScriptRunContext.enqueue
+
+    def enqueue(self, msg):
+        now = time.perf_counter()
+        if msg.HasField("delta"):
+            marks.setdefault("first_element", now)
+            if msg.delta.new_element.WhichOneof("type") == "plotly_chart":
+                marks.setdefault("first_chart", now)
+        return original(self, msg)
+
+    ScriptRunContext.enqueue = enqueue
+    if mode == "fast":
+        os.environ["EPL_FAST_START"] = "1"
+    script = os.path.join(ROOT, "epl.py")
+    if mode == "eager":
+        fd, script = tempfile.mkstemp(suffix=".py")
+        with os.fdopen(fd, "w") as f:
+            f.write(EAGER_SCRIPT.format(root=ROOT, script=os.path.join(ROOT, "epl.py")))
+    try:
+        at = AppTest.from_file(script, default_timeout=120)
+        start = time.perf_counter()
+        at.run()
+        done = time.perf_counter()
+    finally:
+        if mode == "eager":
+            os.remove(script)
+    assert not at.exception, [e.value for e in at.exception]
+    return {
+        "first_element_ms": round((marks["first_element"] - start) * 1000, 1),
+        "first_chart_ms": round((marks["first_chart"] - start) * 1000, 1),
+        "total_ms": round((done - start) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(first_paint(args.worker)))
+        return
+
+    lazy = import_profile(EPL_MODULES)
+    eager = import_profile(EAGER_IMPORTS + EPL_MODULES)
+    print(f"import (-X importtime): eager {sum(eager.values()):.0f}ms -> lazy {sum(lazy.values()):.0f}ms")
+    for name, ms in sorted(eager.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {name:24} {ms:8.1f}ms{'  (deferred)' if name not in lazy else ''}")
+
+    # 毎回新しいプロセス (= 新しいワーカー) で計測し中央値を取る
+    for mode in ("eager", "lazy", "fast"):
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, __file__, "--worker", mode], capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:5}: first element {median['first_element_ms']:7.1f}ms  "
+              f"first chart {median['first_chart_ms']:7.1f}ms  total {median['total_ms']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# pd.read_sql (行タプル経由) と Arrowバッチ取得の比較ベンチマーク
+#   python bench/bench_fetch.py --rows 1000000
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fetch import fetch_frame  # noqa: E402
+
+
+def synthetic_table(rows, seed=0):
+    # QUESTION_DETAIL_WITH_ATTEMPT 相当の合成データ
+    rng = np.random.default_rng(seed)
+    terms = np.array([f"{y}年{s}期" for y in range(2009, 2025) for s in ("春", "秋")])
+    return pa.table({
+        "EXAM_TERM": terms[rng.integers(0, len(terms), rows)],
+        "QUESTION_NO": rng.integers(1, 81, rows),
+        "ATTEMPT_NO": rng.integers(1, 10, rows),
+        "IS_CORRECT": rng.integers(0, 2, rows),
+        "ANSWERED_AT": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit="s"),
+        "ELAPSED_SEC": rng.random(rows) * 120,
+    })
+
+
+class ArrowCursor:
+    # Snowflakeカーソルの Arrow バッチAPIだけを真似たスタンドイン
+    def __init__(self, table, batch_rows):
+        self.table = table
+        self.batch_rows = batch_rows
+        self.description = [(name,) for name in table.column_names]
+
+    def execute(self, query, params=None):
+        return self
+
+    def fetch_arrow_batches(self):
+        for batch in self.table.to_batches(max_chunksize=self.batch_rows):
+            yield pa.Table.from_batches([batch])
+
+    def fetch_pandas_batches(self):
+        for table in self.fetch_arrow_batches():
+            yield table.to_pandas()
+
+    def close(self):
+        pass
+
+
+class ArrowConnection:
+    def __init__(self, table, batch_rows):
+        self.table = table
+        self.batch_rows = batch_rows
+
+    def cursor(self):
+        return ArrowCursor(self.table, self.batch_rows)
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(mode, rows, batch_rows):
+    table = synthetic_table(rows)
+    if mode == "read_sql":
+        conn = sqlite3.connect(":memory:")
+        frame = table.to_pandas()
+        frame["ANSWERED_AT"] = frame["ANSWERED_AT"].astype(str)
+        frame.to_sql("QUESTION_DETAIL_WITH_ATTEMPT", conn, index=False)
+        del frame
+        fetch = lambda: pd.read_sql("SELECT * FROM QUESTION_DETAIL_WITH_ATTEMPT", conn)  # noqa: E731
+    else:
+        conn = ArrowConnection(table, batch_rows)
+        as_arrow = mode == "arrow_table"
+        fetch = lambda: fetch_frame(conn, "SELECT * FROM QUESTION_DETAIL_WITH_ATTEMPT", as_arrow=as_arrow)  # noqa: E731
+
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    result = fetch()
+    elapsed = time.perf_counter() - start
+    assert len(result) == rows
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed),
+        "peak_rss_delta_mb": round(max_rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch-rows", type=int, default=65_536)
+    parser.add_argument("--mode")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_one(args.mode, args.rows, args.batch_rows)))
+        return
+
+    # ピークRSSを分離するためモードごとに別プロセスで実行
+    for mode in ("read_sql", "arrow_pandas", "arrow_table"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--rows", str(args.rows),
+             "--batch-rows", str(args.batch_rows)],
+            check=True, capture_output=True, text=True,
+        )
+        print(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# 共有キャッシュのクエリ集約ベンチマーク (倉庫の代わりに遅延付きの合成ローダーを使う)
+#   python bench/bench_shared_cache.py --replicas 4 --users 8 --views 4
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from result_cache import cache_key  # noqa: E402
+from shared_cache import SharedCache  # noqa: E402
+
+VIEWS = ["EXAM_TERM_ATTEMPT_STATS", "MONTHLY_OVERVIEW", "QUESTION_DETAIL_WITH_ATTEMPT", "EXAM_TERM_ATTEMPT_SUMMARY"]
+
+
+def replica(path, views, users, latency, queries):
+    # 1レプリカ (プロセス) 内で users 人が全ビューを同時に開く
+    cache = SharedCache(path, poll_interval=0.01)
+
+    def warehouse(view):
+        with queries.get_lock():
+            queries.value += 1
+        time.sleep(latency)
+        return pa.table({"VIEW": [view] * 1000, "VALUE": list(range(1000))})
+
+    def user():
+        for view in views:
+            query = f"SELECT * FROM {view}"
+            table = cache.get_or_load(cache_key(query), query, lambda view=view: warehouse(view))
+            assert table.column("VIEW")[0].as_py() == view
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--views", type=int, default=len(VIEWS))
+    parser.add_argument("--latency", type=float, default=0.5, help="倉庫クエリ1本あたりの秒数")
+    args = parser.parse_args()
+    views = (VIEWS + [f"VIEW_{i}" for i in range(len(VIEWS), args.views)])[:args.views]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.sqlite")
+        SharedCache(path)
+        queries = multiprocessing.Value("i", 0)
+        start = time.perf_counter()
+        procs = [
+            multiprocessing.Process(target=replica, args=(path, views, args.users, args.latency, queries))
+            for _ in range(args.replicas)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0, proc.exitcode
+        elapsed = time.perf_counter() - start
+        snap = SharedCache(path).snapshot()
+
+    requests = args.replicas * args.users * len(views)
+    print(f"{args.replicas} replicas x {args.users} users x {len(views)} views = {requests:,} requests")
+    print(f"warehouse queries: {queries.value} (without shared cache: {requests:,})")
+    print(f"elapsed: {elapsed:.2f}s, entries: {snap['entries']}, locks left: {snap['locks']}")
+    assert queries.value == len(views), queries.value
+    assert snap["locks"] == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# セッション数に対する常駐メモリのベンチマーク (st.cache_data のコピー渡しと共有フレームの比較)
+#   python bench/bench_shared_frames.py --rows 1000000 --sessions 1,4,16,64
+# cache_data: 呼び出しごとに pickle から復元した DataFrame (セッションごとに別コピー)
+# shared:     メモリマップした Arrow IPC から作った共有フレームの浅いコピー (shared_frames)
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_fetch import synthetic_table  # noqa: E402
+
+
+def rss_mb():
+    # 現在の常駐メモリ (Linux)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not available")
+
+
+def run_one(mode, path, sessions):
+    import streamlit as st
+
+    import shared_frames
+
+    if mode == "cache_data":
+        @st.cache_data
+        def load():
+            with pa.memory_map(path, "r") as source:
+                return pa.ipc.open_file(source).read_all().to_pandas()
+        get = load
+    else:
+        # refresher / ディスクキャッシュと同じく、メモリマップした Arrow テーブルを1つ保持する
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        store = shared_frames.FrameStore()
+
+        def get():
+            return store.get("detail", table)
+
+    get()  # 初回 (キャッシュ作成) は計測に含めない
+    baseline = rss_mb()
+    start = time.perf_counter()
+    held = [get() for _ in range(sessions)]
+    per_call = (time.perf_counter() - start) / sessions
+    # 各セッションの書き込みは自分のコピーにだけ反映される
+    held[-1].loc[0, "ELAPSED_SEC"] = -1.0
+    assert (held[0]["ELAPSED_SEC"].iloc[0] == -1.0) == (len(held) == 1)
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "rows": len(held[0]),
+        "per_call_ms": round(per_call * 1000, 2),
+        "rss_growth_mb": round(rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sessions", default="1,4,16,64")
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "PATH", "SESSIONS"))
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, path, sessions = args.worker
+        print(json.dumps(run_one(mode, path, int(sessions))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "detail.arrow")
+        table = synthetic_table(args.rows)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        del table
+        for mode in ("cache_data", "shared"):
+            for sessions in [int(x) for x in args.sessions.split(",")]:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, path, str(sessions)],
+                    check=True, capture_output=True, text=True,
+                )
+                print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# 問題別学習履歴の逐次取得ベンチマーク (一括取得 fetch_frame と iter_batches の比較)
+#   python bench/bench_stream.py --rows 100000,1000000
+# 最初の行が届くまでの時間と、取得中のピークRSSをデータ量ごとに別プロセスで測る
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import snowflake_standin  # noqa: E402
+from fetch import fetch_frame, iter_batches  # noqa: E402
+
+QUERY = "SELECT * FROM QUESTION_DETAIL_WITH_ATTEMPT"
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(mode, db, batch_rows):
+    stats = snowflake_standin.StandInStats()
+    conn = snowflake_standin.StandInConnection(db, stats, batch_rows=batch_rows)
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    if mode == "full":
+        table = fetch_frame(conn, QUERY, as_arrow=True)
+        first_row = time.perf_counter()
+        rows = table.num_rows
+    else:
+        # 表示側と同じく各バッチを描画したら手放す (全件の組み立てはキャッシュ側の仕事)
+        first_row, rows = None, 0
+        for batch in iter_batches(conn, QUERY):
+            if first_row is None:
+                first_row = time.perf_counter()
+            rows += batch.num_rows
+    done = time.perf_counter()
+    return {
+        "mode": mode,
+        "rows": rows,
+        "first_row_ms": round((first_row - start) * 1000, 1),
+        "total_ms": round((done - start) * 1000, 1),
+        "peak_rss_delta_mb": round(max_rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "DB"))
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_one(*args.worker, args.batch_rows)))
+        return
+
+    for rows in [int(x) for x in args.rows.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "standin.sqlite")
+            # ru_maxrss は子プロセスに引き継がれるため、データ生成も別プロセスで行う
+            subprocess.run([sys.executable, snowflake_standin.__file__, db, str(rows), "1"], check=True, capture_output=True)
+            for mode in ("full", "stream"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, db, "--batch-rows", str(args.batch_rows)],
+                    check=True, capture_output=True, text=True,
+                )
+                print(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# 優勝争いシミュレーション (epl_simulate) のベンチマーク
+#   python bench/bench_title_race.py --seasons 200000 --teams 8,20 --workers 1,2,4
+# inline: 同じプロセスで全バッチを計算 (1コア)
+# pool:   forkserver のプロセスプールにバッチを分配 (起動済みのプールで計測)
+# 各行に1秒あたりのシーズン数と、それを使用コア数で割った値を出力する
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import epl_data  # noqa: E402
+import epl_simulate  # noqa: E402
+
+
+def rates_for(teams):
+    # 8チームは組み込みデータ、それ以上は同程度の戦力差の合成チーム
+    if teams <= len(epl_data.TEAM_STATS["チーム"]):
+        return epl_simulate.team_rates(pd.DataFrame(epl_data.TEAM_STATS)).head(teams)
+    rng = np.random.default_rng(teams)
+    return epl_simulate.team_rates(pd.DataFrame({
+        "チーム": [f"Club {i}" for i in range(teams)],
+        "総得点": rng.integers(1200, 2200, teams),
+        "総失点": rng.integers(550, 950, teams),
+    }))
+
+
+def measure(rates, seasons, seed, executor=None):
+    start = time.perf_counter()
+    result = epl_simulate.simulate(rates, seasons, seed, executor=executor)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, default=200_000)
+    parser.add_argument("--teams", default="8,20")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, os.cpu_count()})))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    context = multiprocessing.get_context("forkserver")
+
+    for teams in [int(x) for x in args.teams.split(",")]:
+        rates = rates_for(teams)
+        elapsed, expected = measure(rates, args.seasons, args.seed)
+        rows = [{"mode": "inline", "workers": 1, "seconds": elapsed}]
+        for workers in [int(x) for x in args.workers.split(",")]:
+            with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                measure(rates, workers * epl_simulate.BATCH_SEASONS, args.seed, executor)  # ワーカー起動
+                elapsed, result = measure(rates, args.seasons, args.seed, executor)
+            # 同じシードならワーカー数によらず同じ結果
+            pd.testing.assert_frame_equal(result, expected)
+            rows.append({"mode": "pool", "workers": workers, "seconds": elapsed})
+        for row in rows:
+            rate = args.seasons / row["seconds"]
+            print(json.dumps({
+                "teams": teams,
+                "matches_per_season": teams * (teams - 1),
+                "seasons": args.seasons,
+                **row,
+                "seconds": round(row["seconds"], 3),
+                "seasons_per_sec": round(rate),
+                "seasons_per_sec_per_core": round(rate / min(row["workers"], os.cpu_count())),
+            }))
+        print(expected.head(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
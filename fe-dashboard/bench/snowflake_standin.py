@@ -0,0 +1,275 @@
+# ベンチマーク用の Snowflake スタンドイン (SQLite にダッシュボードの4ビューと EPL テーブルを生成)
+#   install(path) で snowflake.connector.connect を差し替える
+#   slow={ビュー名: 秒} でそのビューを読むクエリだけ遅くできる (非同期投入・中止の確認用)
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from epl_source import SnowflakeSource  # noqa: E402
+from snowflake.connector.errors import ProgrammingError  # noqa: E402
+
+_PARAM = re.compile(r"%\((\w+)\)s")
+EXAM_TERMS = [f"{y}年{s}期" for y in range(2009, 2025) for s in ("春", "秋")]
+
+
+def dashboard_tables(rows, seed=0):
+    """QUESTION_DETAIL_WITH_ATTEMPT (rows 行) と、そこから集計した残り3ビュー"""
+    rng = np.random.default_rng(seed)
+    detail = pd.DataFrame({
+        "EXAM_TERM": np.array(EXAM_TERMS)[rng.integers(0, len(EXAM_TERMS), rows)],
+        "QUESTION_NO": rng.integers(1, 81, rows),
+        "ATTEMPT_NO": rng.integers(1, 10, rows),
+        "IS_CORRECT": rng.integers(0, 2, rows),
+        "ANSWERED_AT": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit="s"))
+        .strftime("%Y-%m-%d %H:%M:%S"),
+        "ELAPSED_SEC": rng.random(rows) * 120,
+    })
+    return {"QUESTION_DETAIL_WITH_ATTEMPT": detail, **aggregate_views(detail)}
+
+
+def aggregate_views(detail):
+    """問題別学習履歴から集計した残り3ビュー (Snowflake 側のビュー定義の代わり)"""
+    stats = (
+        detail.groupby(["EXAM_TERM", "ATTEMPT_NO"], as_index=False)["IS_CORRECT"].mean()
+        .rename(columns={"IS_CORRECT": "ACCURACY"})
+    )
+    stats["ACCURACY"] = (stats["ACCURACY"] * 100).round(1)
+    stats["AVERAGE_ACCURACY"] = stats.groupby("EXAM_TERM")["ACCURACY"].transform("mean").round(1)
+    monthly = (
+        detail.assign(STUDY_MONTH=detail["ANSWERED_AT"].str[:7])
+        .groupby("STUDY_MONTH", as_index=False)
+        .agg(ACCURACY=("IS_CORRECT", "mean"), TOTAL=("IS_CORRECT", "size"))
+    )
+    monthly["ACCURACY"] = (monthly["ACCURACY"] * 100).round(1)
+    summary = detail.groupby("EXAM_TERM", as_index=False).agg(
+        ATTEMPTS=("ATTEMPT_NO", "max"),
+        QUESTIONS=("QUESTION_NO", "nunique"),
+        ANSWERS=("IS_CORRECT", "size"),
+        ACCURACY=("IS_CORRECT", "mean"),
+    )
+    summary["ACCURACY"] = (summary["ACCURACY"] * 100).round(1)
+    return {
+        "EXAM_TERM_ATTEMPT_STATS": stats,
+        "MONTHLY_OVERVIEW": monthly,
+        "EXAM_TERM_ATTEMPT_SUMMARY": summary,
+    }
+
+
+def epl_tables(rows, seed=0):
+    """EPL_SEASONS (rows シーズン) / EPL_TEAMS"""
+    rng = np.random.default_rng(seed)
+    teams = [f"Club {i}" for i in range(40)]
+    start = 3000 + np.arange(rows)
+    seasons = pd.DataFrame({
+        "シーズン": [f"{y}-{(y + 1) % 100:02d}" for y in start[::-1]],
+        "優勝チーム": rng.choice(teams, rows),
+        "勝ち点": rng.integers(70, 101, rows),
+        "得点": rng.integers(60, 107, rows),
+        "失点": rng.integers(15, 45, rows),
+        "得点王": rng.choice([f"Player {i}" for i in range(2000)], rows),
+        "得点王ゴール数": rng.integers(18, 37, rows),
+        "アシスト王": rng.choice([f"Player {i}" for i in range(2000)], rows),
+        "アシスト数": rng.integers(10, 21, rows),
+        "クリーンシート王": rng.choice([f"Keeper {i}" for i in range(300)], rows),
+        "クリーンシート数": rng.integers(12, 25, rows),
+        "平均観客数": rng.integers(8000, 60000, rows),
+    })
+    n = len(teams)
+    team_stats = pd.DataFrame({
+        "チーム": teams,
+        "総得点": rng.integers(800, 2200, n),
+        "総失点": rng.integers(500, 1000, n),
+        "平均勝ち点": rng.uniform(45, 85, n).round(1),
+        "最高順位": rng.integers(1, 3, n),
+        "最低順位": rng.integers(5, 21, n),
+    })
+    return {
+        SnowflakeSource.TABLES["seasons"]: seasons,
+        SnowflakeSource.TABLES["teams"]: team_stats,
+    }
+
+
+def build_database(path, dashboard_rows=100_000, epl_rows=100, seed=0):
+    tables = {**dashboard_tables(dashboard_rows, seed), **epl_tables(epl_rows, seed)}
+    with sqlite3.connect(path) as db:
+        for name, frame in tables.items():
+            frame.to_sql(name, db, index=False, if_exists="replace")
+        db.execute("CREATE INDEX IF NOT EXISTS detail_term ON QUESTION_DETAIL_WITH_ATTEMPT (EXAM_TERM)")
+    # SnowflakeSource.version() 用の INFORMATION_SCHEMA.TABLES
+    with sqlite3.connect(path + ".info") as info:
+        info.execute("DROP TABLE IF EXISTS TABLES")
+        info.execute("CREATE TABLE TABLES (TABLE_SCHEMA TEXT, TABLE_NAME TEXT, LAST_ALTERED TEXT)")
+        stamp = pd.Timestamp.now().isoformat()
+        info.executemany(
+            "INSERT INTO TABLES VALUES ('PUBLIC', ?, ?)",
+            [(name, stamp) for name in SnowflakeSource.TABLES.values()],
+        )
+    return {name: len(frame) for name, frame in tables.items()}
+
+
+class StandInStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.queries = 0
+        self.rows = 0
+        self.aborted = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self):
+        with self._lock:
+            return {"connects": self.connects, "queries": self.queries, "rows": self.rows, "aborted": self.aborted}
+
+
+class StandInCursor:
+    # snowflake.connector のカーソルのうち fetch.py / snowflake_pool.py が使う部分
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self.sfqid = None
+        self._cursor = None
+
+    def _run(self, query, params):
+        self._cursor = self.conn.db.execute(_PARAM.sub(r":\1", query), params or {})
+        self.description = self._cursor.description
+        self.conn.stats.add(queries=1)
+
+    def execute(self, query, params=None):
+        latency = self.conn.latency_for(query)
+        if latency:
+            time.sleep(latency)
+        self.sfqid = str(uuid.uuid4())
+        self._run(query, params)
+        return self
+
+    def execute_async(self, query, params=None):
+        # 完了予定時刻だけ記録し、結果は get_results_from_sfqid で読む
+        self.sfqid = str(uuid.uuid4())
+        self.conn._submit(self.sfqid, query, params)
+        return {"queryId": self.sfqid}
+
+    def get_results_from_sfqid(self, qid):
+        self.sfqid = qid
+        self._run(*self.conn._take(qid))
+
+    def abort_query(self, qid):
+        return self.conn._abort(qid)
+
+    def _columns(self):
+        return [col[0] for col in self.description or []]
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self.conn.stats.add(rows=len(rows))
+        return rows
+
+    def fetch_pandas_batches(self):
+        while True:
+            rows = self._cursor.fetchmany(self.conn.batch_rows)
+            if not rows:
+                return
+            self.conn.stats.add(rows=len(rows))
+            yield pd.DataFrame.from_records(rows, columns=self._columns())
+
+    def fetch_arrow_batches(self):
+        for frame in self.fetch_pandas_batches():
+            yield pa.Table.from_pandas(frame, preserve_index=False)
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, path, stats, latency=0.0, batch_rows=65_536, slow=None):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("ATTACH DATABASE ? AS INFORMATION_SCHEMA", (path + ".info",))
+        self.db.create_function("CURRENT_SCHEMA", 0, lambda: "PUBLIC")
+        self.stats = stats
+        self.latency = latency
+        self.batch_rows = batch_rows
+        self.slow = dict(slow or {})
+        self._lock = threading.Lock()
+        self._async = {}
+        self._closed = False
+
+    def latency_for(self, query):
+        return self.latency + sum(sec for view, sec in self.slow.items() if view in query)
+
+    def _submit(self, qid, query, params):
+        with self._lock:
+            self._async[qid] = {"query": query, "params": params, "due": time.monotonic() + self.latency_for(query)}
+
+    def _take(self, qid):
+        with self._lock:
+            entry = self._async.pop(qid)
+        return entry["query"], entry["params"]
+
+    def _abort(self, qid):
+        with self._lock:
+            entry = self._async.get(qid)
+            if entry is None or "aborted" in entry:
+                return False
+            entry["aborted"] = True
+        self.stats.add(aborted=1)
+        return True
+
+    def get_query_status_throw_if_error(self, qid):
+        with self._lock:
+            entry = self._async[qid]
+        if entry.get("aborted"):
+            raise ProgrammingError(f"SQL execution canceled: {qid}")
+        return "RUNNING" if time.monotonic() < entry["due"] else "SUCCESS"
+
+    def is_still_running(self, status):
+        return status == "RUNNING"
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def is_closed(self):
+        return self._closed
+
+    def close(self):
+        self._closed = True
+        self.db.close()
+
+
+def install(path, latency=0.0, slow=None):
+    """snowflake.connector.connect を path の SQLite を返すスタンドインに差し替える"""
+    import snowflake.connector
+
+    stats = StandInStats()
+
+    def connect(**kwargs):
+        stats.add(connects=1)
+        return StandInConnection(path, stats, latency=latency, slow=slow)
+
+    snowflake.connector.connect = connect
+    return stats
+
+
+def secrets():
+    # get_pool() が読む接続情報 (値はスタンドインでは使わない)
+    return {key: "standin" for key in ("user", "password", "account", "warehouse", "database", "schema")}
+
+
+if __name__ == "__main__":
+    # python bench/snowflake_standin.py /tmp/standin.sqlite [dashboard_rows] [epl_rows]
+    target = sys.argv[1] if len(sys.argv) > 1 else "standin.sqlite"
+    counts = [int(n) for n in sys.argv[2:4]]
+    print(build_database(target, *counts))
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# これ以上の点数は間引く / これ以上の行数は WebGL (Scattergl) で描画する
+DEFAULT_TARGET = 2000
+WEBGL_THRESHOLD = 1000
+
+
+def render_mode(rows, threshold=WEBGL_THRESHOLD):
+    # px.line / px.scatter の render_mode
+    return "webgl" if rows > threshold else "auto"
+
+
+def _x_values(x):
+    # 数値・日時以外 (シーズン名など) は並び順の位置を x とする
+    x = pd.Series(x)
+    if pd.api.types.is_numeric_dtype(x) and not isinstance(x.dtype, pd.CategoricalDtype):
+        return _y_values(x)
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return _y_values(x.astype("int64"))
+    return np.arange(len(x), dtype=float)
+
+
+def _y_values(y):
+    # Arrow 型 (欠損は pd.NA) の列も NaN を含む float 配列にそろえる
+    return pd.Series(y).to_numpy(dtype=float, na_value=np.nan)
+
+
+def minmax_indices(y, target=DEFAULT_TARGET):
+    """位置で等分したバケットごとに最小・最大の点を残す (両端の点も残す)
+
+    各バケットの極値を必ず含むため、折れ線の山・谷が消えない。
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= target:
+        return np.arange(n)
+    valid = np.flatnonzero(~np.isnan(y))
+    m = len(valid)
+    if m <= target:
+        return valid
+    buckets = max(1, (target - 2) // 2)
+    values = y[valid]
+    # バケットは位置の昇順に並ぶため、reduceat で各バケットの最小・最大を求める
+    bucket = (np.arange(m) * buckets) // m
+    starts = np.searchsorted(bucket, np.arange(buckets))
+    counts = np.diff(np.r_[starts, m])
+    keep = [np.array([0, m - 1])]
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(values == np.repeat(reduce.reduceat(values, starts), counts))
+        # 同じ値が複数あればバケット内の先頭を使う
+        _, first = np.unique(bucket[hits], return_index=True)
+        keep.append(hits[first])
+    keep = np.concatenate(keep)
+    return valid[np.unique(keep)]
+
+
+def lttb_indices(x, y, target=DEFAULT_TARGET):
+    """Largest-Triangle-Three-Buckets で target 点を選ぶ (両端の点は必ず残す)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= target or target < 3:
+        return np.arange(n)
+    valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    if len(valid) < n:
+        # 欠損を除いた点で選び、元の位置に戻す
+        return valid[lttb_indices(x[valid], y[valid], target)]
+    # 先頭・末尾を除いた点を target - 2 個のバケットに分ける
+    edges = np.linspace(1, n - 1, target - 1).astype(int)
+    keep = np.empty(target, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(target - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        # 前に選んだ点・次のバケット平均と作る三角形の面積が最大の点
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.nanargmax(area)) if end > start else start
+        keep[i + 1] = a
+    return np.unique(keep)
+
+
+def reduce_indices(x, y, target=DEFAULT_TARGET, method="minmax"):
+    if method == "lttb":
+        return lttb_indices(_x_values(x), y, target)
+    return minmax_indices(y, target)
+
+
+def reduce_frame(df, x, y, target=DEFAULT_TARGET, method="minmax", by=None):
+    """描画用に行を間引いた DataFrame を返す (行の並びは元のまま)
+
+    by を指定した場合は全体で target 点以内になるよう、グループ (系列) ごとに均等に間引く。
+    グループが多すぎて各グループの両端・極値を残せない (target // グループ数 < 4) 場合は、
+    全体を1系列として間引く。
+    """
+    if len(df) <= target:
+        return df
+    groups = [] if by is None else list(df.groupby(by, observed=True, sort=False).indices.values())
+    if len(groups) * 4 > target or len(groups) <= 1:
+        groups = [np.arange(len(df))]
+    per_group = target // len(groups)
+    keep = [
+        positions[reduce_indices(df[x].iloc[positions], _y_values(df[y].iloc[positions]), per_group, method)]
+        for positions in groups
+    ]
+    return df.iloc[np.sort(np.concatenate(keep))]
+
+
+def reduce_series(series, target=DEFAULT_TARGET, method="minmax"):
+    # st.line_chart 用 (index を x とする)
+    if len(series) <= target:
+        return series
+    return series.iloc[reduce_indices(series.index, _y_values(series), target, method)]
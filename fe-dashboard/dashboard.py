@@ -1,54 +1,343 @@
+import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pyarrow as pa
 import streamlit as st
-import pandas as pd
-import snowflake.connector
 
+import chart_reduce
+import learning_analytics
+import queries
+import query_trace
+import shared_frames
+from fetch import fetch_frame, iter_batches
+from incremental import IncrementalLoader
+from query_control import QueryCancelled, get_query_control
+from query_trace import get_query_log
+from refresher import Refresher
+from result_cache import cache_key, get_result_cache
+from shared_cache import get_shared_cache
+from snowflake_pool import get_pool
+from streaming import StreamRegistry
+
+logger = logging.getLogger("dashboard")
+
+shared_frames.enable_copy_on_write()
+
+# 結果を待つセッションが再実行・停止の要求を確認する間隔 (秒)
+WAIT_POLL = 0.25
+
+
+def shared_load(refresher, key, query, load, refresh):
+    # 共有キャッシュがあれば、同じビューの取得は全レプリカで1本にまとめる
+    # (結果, 取得時刻) を返す。他のレプリカの結果はそのレプリカが取得した時刻のまま
+    shared = get_shared_cache()
+    if shared is None:
+        table = load()
+        return table, time.time()
+
+    def load_from_warehouse():
+        query_trace.annotate(cache="warehouse")
+        return load()
+
+    # 再取得時は他のレプリカが直近 (先読み期間内) に取得した結果のみ使う
+    max_age = refresher.ttl * (1 - refresher.refresh_ahead) if refresh else None
+    query_trace.annotate(cache="shared")
+    with query_trace.span("shared"):
+        return shared.get_or_load(key, query, load_from_warehouse, max_age=max_age, with_created=True)
+
+# クエリ結果のメモリキャッシュ (期限切れ前に裏で再取得し、古い結果をすぐ返す)
+# 下位にはディスク上の Arrow ファイルキャッシュと、任意でレプリカ間の共有キャッシュがある
+@st.cache_resource
+def get_refresher():
+    pool, disk, log, control = get_pool(), get_result_cache(), get_query_log(), get_query_control()
+
+    def load(query, params, refresh=False):
+        key = cache_key(query, params)
+        with log.trace("load", key, query) as trace:
+            trace.attrs.update(cache="disk", refresh=refresh)
+            with query_trace.span("disk"):
+                found = None if refresh else disk.get(key, with_created=True)
+            if found is not None:
+                table, created = found
+            else:
+                trace.attrs["cache"] = "warehouse"
+                # プールから接続を借りて実行 (接続は閉じずに返却、接続エラー時のみ再接続)
+                # 結果は Arrow バッチから列単位で組み立てる
+                # クエリは非同期で投入し、待つセッションがいなくなるかタイムアウトしたら中止する
+                with control.loading(key):
+                    table, created = shared_load(
+                        refresher, key, query,
+                        lambda: pool.run(
+                            lambda conn: fetch_frame(conn, query, params, as_arrow=True, execute=control.execute)
+                        ),
+                        refresh,
+                    )
+                with query_trace.span("disk"):
+                    disk.put(key, table, created)
+            trace.attrs.update(rows=table.num_rows, bytes=table.nbytes)
+        return table, created
+
+    refresher = Refresher(load, ttl=disk.ttl)
+    return refresher
+
+# 問題別学習履歴は追記のみのため、期限切れ時は高水位線以降の差分だけ取得して結合する
+@st.cache_resource
+def get_detail_cache():
+    pool, disk, log, control = get_pool(), get_result_cache(), get_query_log(), get_query_control()
+    loader = IncrementalLoader(
+        lambda query, params: pool.run(
+            lambda conn: fetch_frame(conn, query, params, as_arrow=True, execute=control.execute)
+        ),
+        watermark=st.secrets.get("dashboard", {}).get("question_detail_watermark", queries.QUESTION_DETAIL_WATERMARK),
+    )
+
+    def load(exam_term, refresh=False):
+        query = queries.question_detail(exam_term)
+        key = cache_key(*query)
+        with log.trace("load", key, query.sql) as trace:
+            trace.attrs.update(cache="disk", refresh=refresh)
+            with query_trace.span("disk"):
+                found = None if refresh else disk.get(key, with_created=True)
+            if found is not None:
+                table, created = found
+            else:
+                trace.attrs["cache"] = "warehouse"
+                with control.loading(key):
+                    table, created = shared_load(
+                        refresher, key, query.sql,
+                        lambda: loader.load(
+                            key, "QUESTION_DETAIL_WITH_ATTEMPT",
+                            where=None if exam_term is None else {"EXAM_TERM": exam_term},
+                        ),
+                        refresh,
+                    )
+                with query_trace.span("disk"):
+                    disk.put(key, table, created)
+            # 他のレプリカ・ディスクから読んだ結果でも次回は差分取得できるようにする
+            loader.seed(key, table)
+            trace.attrs.update(rows=table.num_rows, bytes=table.nbytes)
+        return table, created
+
+    refresher = Refresher(load, ttl=disk.ttl)
+    return refresher, loader
+
+# 結果の DataFrame は全セッションで1つを共有し、呼び出しごとには浅いコピーを渡す
+@st.cache_resource
+def get_frame_store():
+    return shared_frames.FrameStore()
+
+def interruptible_wait(key):
+    # 結果を待つ間も定期的に空要素を書き込む。Streamlit は要素の書き込み時に再実行・停止の
+    # 要求を例外として送出するため、ページ切替・選択変更ですぐ待ちを抜けられる
+    # 抜けたときに待つセッションがいなくなれば、取得中のクエリは中止される
+    def wait(future):
+        with get_query_control().waiting(key):
+            placeholder = st.empty()
+            while True:
+                try:
+                    return future.result(timeout=WAIT_POLL)
+                except FutureTimeout:
+                    placeholder.empty()
+    return wait
+
+# 呼び出し側から見た待ち時間と DataFrame 変換の時間を記録する
+def traced_get(refresher, key, query, args, as_arrow=False):
+    with get_query_log().trace("request", key, query) as trace:
+        try:
+            with query_trace.span("wait"):
+                try:
+                    table = refresher.get(key, *args, wait=interruptible_wait(key))
+                except QueryCancelled:
+                    # 他のセッションが離れて中止された取得に合流していた場合は取り直す
+                    table = refresher.get(key, *args, wait=interruptible_wait(key))
+        finally:
+            trace.attrs["cache"] = "miss" if trace.attrs.get("memory") in ("miss", "expired") else "memory"
+        trace.attrs.update(rows=table.num_rows, bytes=table.nbytes)
+        if as_arrow:
+            return table
+        with query_trace.span("build"):
+            return get_frame_store().get(key, table)
+
+def run_question_detail(exam_term):
+    query = queries.question_detail(exam_term)
+    refresher, _ = get_detail_cache()
+    return traced_get(refresher, cache_key(*query), query.sql, (exam_term,))
+
+# 問題別学習履歴の全件から集計を導出する (集計は全セッションで共有し、追記分だけ加算して更新)
+@st.cache_resource
+def get_learning_analytics():
+    conf = st.secrets.get("analytics", {})
+    return learning_analytics.LearningAnalytics(
+        watermark=st.secrets.get("dashboard", {}).get("question_detail_watermark", queries.QUESTION_DETAIL_WATERMARK),
+        half_life_days=float(conf.get("half_life_days", 30)),
+        stability_days=float(conf.get("stability_days", 7)),
+    )
+
+def run_learning_analytics():
+    query = queries.question_detail()
+    refresher, _ = get_detail_cache()
+    table = traced_get(refresher, cache_key(*query), query.sql, (None,), as_arrow=True)
+    analytics = get_learning_analytics()
+    analytics.sync(table)
+    return analytics
+
+# secrets の [dashboard] local_analytics = true でページ1・2・4も集計ビューを使わずローカルで集計
+LOCAL_ANALYTICS = st.secrets.get("dashboard", {}).get("local_analytics", False)
+
+# 問題別学習履歴の逐次取得 (試験回ごとに1本、取得中は他のセッションも同じ取得を読む)
 @st.cache_resource
-def init_connection():
-    return snowflake.connector.connect(
-        user=st.secrets["snowflake"]["user"],
-        password=st.secrets["snowflake"]["password"],
-        account=st.secrets["snowflake"]["account"],
-        warehouse=st.secrets["snowflake"]["warehouse"],
-        database=st.secrets["snowflake"]["database"],
-        schema=st.secrets["snowflake"]["schema"],
-        client_session_keep_alive=True
+def get_detail_streams():
+    return StreamRegistry()
+
+# 取得中に表示する行数の上限 (全件は取得完了後に表示)
+STREAM_PREVIEW_ROWS = 10_000
+
+def open_question_detail(exam_term):
+    """キャッシュ済みなら pyarrow.Table を、なければ取得中の BatchStream を返す
+
+    キャッシュ済みの結果は通常の取得と同じく期限を過ぎたら裏で差分を再取得する。
+    全件がそろった時点でメモリ・ディスク (・共有) キャッシュと差分取得の起点に登録する。
+    """
+    query = queries.question_detail(exam_term)
+    key = cache_key(*query)
+    refresher, loader = get_detail_cache()
+    disk = get_result_cache()
+    if refresher.peek(key) is None:
+        found = disk.get(key, with_created=True)
+        if found is not None:
+            # ディスクに書かれた時刻から期限を数える
+            table, created = found
+            refresher.put(key, table, created)
+            loader.seed(key, table)
+    if refresher.peek(key) is not None:
+        return traced_get(refresher, key, query.sql, (exam_term,), as_arrow=True)
+
+    def produce():
+        with get_query_log().trace("load", key, query.sql) as trace:
+            trace.attrs.update(cache="warehouse", stream=True)
+            control = get_query_control()
+            with control.loading(key), get_pool().lease() as conn:
+                for batch in iter_batches(conn, query.sql, query.params, execute=control.execute):
+                    trace.attrs["rows"] = trace.attrs.get("rows", 0) + batch.num_rows
+                    trace.attrs["bytes"] = trace.attrs.get("bytes", 0) + batch.nbytes
+                    yield batch
+
+    def on_complete(table):
+        refresher.put(key, table)
+        loader.seed(key, table)
+        disk.put(key, table)
+        shared = get_shared_cache()
+        if shared is not None:
+            shared.put(key, query.sql, table)
+
+    return get_detail_streams().open(key, produce, on_complete)
+
+def render_stream(stream):
+    # 取得中は先頭 STREAM_PREVIEW_ROWS 行までをバッチごとに追加表示し、
+    # 全件がそろったらキャッシュに登録された結果 (全セッションで共有) に差し替える
+    status = st.status("問題別学習履歴を取得中...", expanded=False)
+    placeholder = st.empty()
+    preview, shown = [], 0
+    with get_query_control().waiting(stream.key):
+        for batch in stream.batches(poll=WAIT_POLL):
+            if batch is not None and shown < STREAM_PREVIEW_ROWS:
+                preview.append(batch.slice(0, STREAM_PREVIEW_ROWS - shown))
+                shown += preview[-1].num_rows
+                placeholder.dataframe(shared_frames.arrow_frame(pa.Table.from_batches(preview)))
+            # 次のバッチを待つ間も再実行・停止の要求を確認する
+            status.update(label=f"問題別学習履歴を取得中... {stream.rows:,} 行")
+    preview.clear()
+    placeholder.dataframe(get_frame_store().get(stream.key, stream.result))
+    status.update(label=f"{stream.rows:,} 行を取得しました", state="complete")
+
+# クエリ実行関数 (SQL・パラメータの組ごとに別キャッシュ)
+def run_query(query, params=None, as_arrow=False):
+    return traced_get(get_refresher(), cache_key(query, params), query, (query, params), as_arrow)
+
+# 試験回セレクトボックスの選択肢 (DISTINCT のみ取得)
+def exam_term_options(view):
+    return run_query(*queries.exam_term_options(view))["EXAM_TERM"].tolist()
+
+# 全ページの初期表示に必要なクエリを並列で投入する (結果は待たない)
+def prefetch_views():
+    refresher = get_refresher()
+    detail_refresher, _ = get_detail_cache()
+
+    def prime(query):
+        return refresher.prime(cache_key(*query), *query)
+
+    def prime_first_term(view, prime_term):
+        # 選択肢の取得後、初期選択 (先頭の試験回) のデータも続けて取得
+        def on_done(future):
+            if future.exception() is None and future.result().num_rows:
+                prime_term(future.result().column("EXAM_TERM")[0].as_py())
+        prime(queries.exam_term_options(view)).add_done_callback(on_done)
+
+    if LOCAL_ANALYTICS:
+        detail_refresher.prime(cache_key(*queries.question_detail()), None)
+    else:
+        prime_first_term("EXAM_TERM_ATTEMPT_STATS", lambda term: prime(queries.exam_term_stats(term)))
+        prime(queries.monthly_overview())
+        prime(queries.exam_term_summary())
+    prime_first_term(
+        "QUESTION_DETAIL_WITH_ATTEMPT",
+        lambda term: detail_refresher.prime(cache_key(*queries.question_detail(term)), term),
     )
-# クエリ実行関数
-@st.cache_data(ttl=600)
-def run_query(query):
-    try:
-        conn = init_connection()
-        # 連携テスト
-        conn.cursor().execute("SELECT 1")
-        return pd.read_sql(query, conn)
-    except:
-        # 連携失敗の場合キャッシュクリア後はre-try
-        st.cache_resource.clear()
-        conn = init_connection()
-        return pd.read_sql(query, conn)
-    finally:
-        if 'conn' in locals():
-            conn.close()
-    
+
 st.title("基本情報技術者 学習ダッシュボード")
 
+# セッション開始時に全ビューを事前取得 (secrets の [dashboard] prefetch = true で有効)
+if st.secrets.get("dashboard", {}).get("prefetch", False) and "prefetched" not in st.session_state:
+    st.session_state["prefetched"] = True
+    prefetch_views()
+
 # サイドバーのメニュー
 menu = st.sidebar.radio("表示するページを選択", [
     "1. 試験回ごとの正解率",
     "2. 月別 学習サマリー",
     "3. 問題別 学習履歴",
-    "4. 試験回の概要"
+    "4. 試験回の概要",
+    "5. 学習分析",
 ])
 
+with st.sidebar.expander("接続プール統計"):
+    st.json(get_pool().stats.snapshot())
+
+with st.sidebar.expander("結果キャッシュ統計"):
+    st.json(get_result_cache().snapshot())
+    st.json(get_refresher().snapshot())
+    st.json(get_detail_cache()[1].snapshot())
+    st.json(get_frame_store().snapshot())
+    st.json(get_learning_analytics().snapshot())
+    if get_shared_cache() is not None:
+        st.json(get_shared_cache().snapshot())
+
+with st.sidebar.expander("実行中のクエリ"):
+    st.json(get_query_control().snapshot())
+
+with st.sidebar.expander("クエリ計測 (遅い順)"):
+    query_log = get_query_log()
+    slowest = query_log.slowest(20)
+    if slowest:
+        st.dataframe(
+            [{**{k: v for k, v in t.items() if k != "spans"}, **t["spans"]} for t in slowest],
+            use_container_width=True,
+        )
+    st.download_button("メトリクス (Prometheus)", query_log.prometheus_text(), file_name="dashboard_metrics.prom")
+
 try:
     # 試験回ごとの正解率
     if menu == "1. 試験回ごとの正解率":
-        df = run_query("SELECT * FROM EXAM_TERM_ATTEMPT_STATS")
-        if not df.empty:
-            exam_terms = df["EXAM_TERM"].unique()
+        analytics = run_learning_analytics() if LOCAL_ANALYTICS else None
+        exam_terms = analytics.exam_terms() if analytics else exam_term_options("EXAM_TERM_ATTEMPT_STATS")
+        if exam_terms:
             selected = st.selectbox("試験回を選んでください", exam_terms)
-            filtered = df[df["EXAM_TERM"] == selected]
-            st.line_chart(filtered.set_index("ATTEMPT_NO")["ACCURACY"])
+            if analytics:
+                filtered = analytics.exam_term_stats(selected)
+            else:
+                filtered = run_query(*queries.exam_term_stats(selected))
+            st.line_chart(chart_reduce.reduce_series(filtered.set_index("ATTEMPT_NO")["ACCURACY"]))
             st.metric("平均正解率", f"{filtered['AVERAGE_ACCURACY'].iloc[0]}%")
             st.dataframe(filtered)
         else:
@@ -56,33 +345,61 @@ try:
 
     # 月別 学習サマリー
     elif menu == "2. 月別 学習サマリー":
-        df = run_query("SELECT * FROM MONTHLY_OVERVIEW")
+        df = run_learning_analytics().monthly_overview() if LOCAL_ANALYTICS else run_query(*queries.monthly_overview())
         if not df.empty:
             selected = st.selectbox("月を選んでください", df["STUDY_MONTH"].unique())
             row = df[df["STUDY_MONTH"] == selected].iloc[0]
             st.metric("正解率", f"{row['ACCURACY']}%")
             st.metric("問題数", int(row['TOTAL']))
-            st.line_chart(df.set_index("STUDY_MONTH")["ACCURACY"])
+            st.line_chart(chart_reduce.reduce_series(df.set_index("STUDY_MONTH")["ACCURACY"]))
         else:
             st.warning("データを見つかりませんでした。")
 
     # 問題別 学習履歴
     elif menu == "3. 問題別 学習履歴":
-        df = run_query("SELECT * FROM QUESTION_DETAIL_WITH_ATTEMPT")
-        if not df.empty:
-            selected = st.selectbox("試験回を選択", df["EXAM_TERM"].dropna().unique())
-            st.dataframe(df[df["EXAM_TERM"] == selected])
+        exam_terms = exam_term_options("QUESTION_DETAIL_WITH_ATTEMPT")
+        if exam_terms:
+            selected = st.selectbox("試験回を選択", exam_terms)
+            # secrets の [dashboard] stream_question_detail = true で逐次表示
+            if st.secrets.get("dashboard", {}).get("stream_question_detail", False):
+                result = open_question_detail(selected)
+                if isinstance(result, pa.Table):
+                    st.dataframe(get_frame_store().get(cache_key(*queries.question_detail(selected)), result))
+                else:
+                    render_stream(result)
+            else:
+                st.dataframe(run_question_detail(selected))
         else:
             st.warning("データを見つかりませんでした。")
 
     # 試験回の概要
     elif menu == "4. 試験回の概要":
-        df = run_query("SELECT * FROM EXAM_TERM_ATTEMPT_SUMMARY")
+        df = run_learning_analytics().exam_term_summary() if LOCAL_ANALYTICS else run_query(*queries.exam_term_summary())
         if not df.empty:
             st.dataframe(df)
         else:
             st.warning("データを見つかりませんでした。")
+
+    # 学習分析 (問題別学習履歴の全件からローカルで集計)
+    elif menu == "5. 学習分析":
+        analytics = run_learning_analytics()
+        exam_terms = analytics.exam_terms()
+        if exam_terms:
+            choice = st.selectbox("試験回を選択", ["すべて"] + exam_terms)
+            exam_term = None if choice == "すべて" else choice
+            window = st.slider("移動正解率の日数", 1, 60, 7)
+            rolling = analytics.rolling_accuracy(window, exam_term)
+            st.line_chart(rolling.set_index("STUDY_DATE")[["ACCURACY", "ROLLING_ACCURACY"]])
+            st.subheader("弱点分野ランキング")
+            st.dataframe(analytics.weak_topics(exam_term), hide_index=True)
+            st.subheader("復習が必要な問題 (習熟度が低く、忘れかけている順)")
+            mastery = analytics.mastery(exam_term)
+            recall = mastery["MASTERY"] * (1 - mastery["FORGETTING"] / 100)
+            st.dataframe(mastery.loc[recall.sort_values().index[:50]], hide_index=True)
+        else:
+            st.warning("データを見つかりませんでした。")
             
 except Exception as e:
+    logger.exception("page %s failed", menu)
     st.error(f"エラーが発生しました。: {str(e)}")
     st.info("Snowflake連係情報をテーブルを確認してください。")
\ No newline at end of file
@@ -1,11 +1,26 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+import streamlit as st
+
+import epl_aggregate
+import epl_cards
+import epl_charts
+import epl_data
+import epl_profile
+import epl_simulate
+import epl_source
+import epl_table
+import shared_frames
+
+shared_frames.enable_copy_on_write()
+
+# 起動優先モード (EPL_FAST_START=1): 選択中のタブだけを描画し、メモリ使用量は要求時のみ計算する
+FAST_START = os.environ.get("EPL_FAST_START") == "1"
+
 # ページ設定
 st.set_page_config(
     page_title="EPLチャンピオンダッシュボード",
@@ -14,148 +29,92 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# カスタムCSS - サッカーテーマ
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap');
-    
-    .main-header {
-        font-family: 'Inter', sans-serif;
-        font-size: 3.5rem;
-        font-weight: 800;
-        background: linear-gradient(45deg, #00FF41, #FFFFFF, #FF0040);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 2rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, #004225 0%, #00B04F 100%);
-        border: 3px solid #FFFFFF;
-        padding: 1.5rem;
-        border-radius: 15px;
-        color: white;
-        text-align: center;
-        margin: 0.5rem 0;
-        box-shadow: 0 8px 32px rgba(0, 178, 79, 0.4);
-        backdrop-filter: blur(4px);
-    }
-    
-    .metric-card h3 {
-        font-family: 'Inter', sans-serif;
-        color: #FFFFFF;
-        margin-bottom: 0.5rem;
-        font-weight: 600;
-    }
-    
-    .metric-card h2 {
-        font-family: 'Inter', sans-serif;
-        color: #00FF41;
-        font-weight: 700;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.5);
-    }
-    
-    .team-card {
-        background: linear-gradient(135deg, #1a1a1a 0%, #2d2d2d 100%);
-        border-left: 5px solid #00B04F;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 10px;
-        color: white;
-        box-shadow: 0 4px 16px rgba(0, 178, 79, 0.2);
-    }
-    
-    .team-name {
-        font-family: 'Inter', sans-serif;
-        font-size: 1.2rem;
-        color: #00FF41;
-        font-weight: 700;
-    }
-    
-    .player-name {
-        font-family: 'Inter', sans-serif;
-        color: #FFFFFF;
-        font-weight: 600;
-        font-size: 1.1rem;
-    }
-    
-    .stSelectbox > div > div {
-        background-color: #004225;
-        color: white;
-    }
-    
-    .sidebar .sidebar-content {
-        background: linear-gradient(180deg, #004225 0%, #00B04F 100%);
-        color: white;
-    }
-    
-    .football-field {
-        height: 8px;
-        background: linear-gradient(90deg, 
-            #00B04F 0%, #00B04F 10%,
-            #FFFFFF 10%, #FFFFFF 12%,
-            #00B04F 12%, #00B04F 22%,
-            #FFFFFF 22%, #FFFFFF 24%,
-            #00B04F 24%, #00B04F 76%,
-            #FFFFFF 76%, #FFFFFF 78%,
-            #00B04F 78%, #00B04F 88%,
-            #FFFFFF 88%, #FFFFFF 90%,
-            #00B04F 90%, #00B04F 100%
-        );
-        margin: 2rem 0;
-        border-radius: 4px;
-    }
-    
-    .crown-icon {
-        color: #FFD700;
-        font-size: 1.5rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# EPLデータ生成
-@st.cache_data
-def load_epl_data():
-    epl_data = {
-        "シーズン": ["2022-23", "2021-22", "2020-21", "2019-20", "2018-19", "2017-18", "2016-17", "2015-16", "2014-15", "2013-14", "2012-13", "2011-12", "2010-11", "2009-10", "2008-09", "2007-08", "2006-07", "2005-06", "2004-05", "2003-04", "2002-03", "2001-02", "2000-01"],
-        "優勝チーム": ["Manchester City", "Manchester City", "Manchester City", "Liverpool", "Manchester City", "Manchester City", "Chelsea", "Leicester City", "Chelsea", "Manchester City", "Manchester United", "Manchester City", "Manchester United", "Chelsea", "Manchester United", "Manchester United", "Manchester United", "Chelsea", "Chelsea", "Arsenal", "Manchester United", "Arsenal", "Manchester United"],
-        "勝ち点": [89, 93, 86, 99, 98, 100, 93, 81, 87, 86, 89, 89, 80, 86, 90, 87, 89, 91, 95, 90, 83, 87, 80],
-        "得点": [89, 99, 83, 85, 95, 106, 85, 68, 73, 102, 86, 93, 78, 103, 68, 80, 83, 72, 72, 73, 74, 79, 79],
-        "失点": [31, 26, 32, 33, 23, 27, 33, 36, 32, 37, 43, 29, 37, 32, 24, 22, 27, 22, 15, 26, 34, 36, 31],
-        "得点王": ["Erling Haaland", "Mohamed Salah", "Harry Kane", "Jamie Vardy", "Pierre-Emerick Aubameyang", "Mohamed Salah", "Harry Kane", "Harry Kane", "Sergio Aguero", "Luis Suarez", "Robin van Persie", "Robin van Persie", "Carlos Tevez", "Didier Drogba", "Nicolas Anelka", "Cristiano Ronaldo", "Didier Drogba", "Thierry Henry", "Thierry Henry", "Thierry Henry", "Ruud van Nistelrooy", "Thierry Henry", "Jimmy Floyd Hasselbaink"],
-        "得点王ゴール数": [36, 23, 23, 23, 22, 32, 29, 25, 26, 31, 26, 30, 20, 29, 19, 31, 20, 27, 25, 30, 25, 24, 23],
-        "アシスト王": ["Kevin De Bruyne", "Mohamed Salah", "Harry Kane", "Kevin De Bruyne", "Eden Hazard", "Kevin De Bruyne", "Kevin De Bruyne", "Mesut Ozil", "Cesc Fabregas", "Steven Gerrard", "Juan Mata", "Frank Lampard", "Nani", "Frank Lampard", "Ryan Giggs", "Cesc Fabregas", "Cesc Fabregas", "Frank Lampard", "Frank Lampard", "Thierry Henry", "David Beckham", "David Beckham", "David Beckham"],
-        "アシスト数": [16, 13, 14, 20, 15, 16, 18, 19, 18, 13, 12, 16, 18, 20, 11, 13, 13, 16, 13, 20, 13, 11, 12],
-        "クリーンシート王": ["Ederson", "Ederson", "Ederson", "Alisson", "Ederson", "Ederson", "Thibaut Courtois", "Petr Cech", "Petr Cech", "Wojciech Szczesny", "David de Gea", "Joe Hart", "Edwin van der Sar", "Petr Cech", "Edwin van der Sar", "Edwin van der Sar", "Petr Cech", "Petr Cech", "Petr Cech", "Jens Lehmann", "David Seaman", "David Seaman", "Fabien Barthez"],
-        "クリーンシート数": [20, 20, 19, 21, 20, 16, 16, 16, 16, 17, 18, 17, 18, 24, 21, 21, 24, 24, 24, 15, 15, 18, 13],
-        "平均観客数": [54234, 39121, 8456, 39567, 38491, 38374, 36675, 36451, 36176, 36695, 35931, 34601, 35363, 35631, 35440, 35107, 33875, 33373, 33688, 35464, 32157, 32659, 31487]
-    }
-    
-    return pd.DataFrame(epl_data)
-
-# 追加統計データ
-@st.cache_data
-def load_team_stats():
-    team_stats = {
-        "チーム": ["Manchester City", "Manchester United", "Chelsea", "Arsenal", "Liverpool", "Leicester City", "Tottenham", "Everton"],
-        "優勝回数": [7, 6, 5, 3, 1, 1, 0, 0],
-        "総得点": [2156, 1847, 1654, 1789, 1523, 1234, 1456, 1298],
-        "総失点": [674, 789, 723, 834, 567, 678, 745, 892],
-        "平均勝ち点": [82.4, 74.2, 76.8, 69.3, 71.5, 52.3, 64.7, 58.9],
-        "最高順位": [1, 1, 1, 1, 1, 1, 2, 4],
-        "最低順位": [8, 7, 10, 12, 8, 20, 15, 17]
-    }
-    return pd.DataFrame(team_stats)
+# カスタムCSS - サッカーテーマ (epl.css を初回だけ読み込み、空白を詰めて送信量を減らす)
+@st.cache_resource
+def load_css():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "epl.css"), encoding="utf-8") as f:
+        css = re.sub(r"\s+", " ", f.read())
+    return f"<style>{css.strip()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# データソース (環境変数 EPL_DATA_SOURCE で builtin / parquet / snowflake を切り替え)
+@st.cache_resource
+def get_source():
+    return epl_source.source_from_env()
+
+# ソースのバージョン (ファイル更新時刻 / ETag)。変わると以下のデータを読み直す
+@st.cache_data(ttl=30, show_spinner=False)
+def load_data_version():
+    return get_source().version()
+
+# EPLデータ生成 (全セッションで1つのフレームを共有し、呼び出しごとには浅いコピーを渡す)
+@st.cache_resource(max_entries=4)
+def _load_epl_data(version):
+    return epl_data.compact_season_frame(get_source().seasons())
+
+def load_epl_data(version):
+    return shared_frames.view(_load_epl_data(version))
+
+# 追加統計データ (優勝回数はシーズン表から導出)
+@st.cache_resource(max_entries=4)
+def _load_team_stats(version):
+    # 優勝回数は読み込み済みのシーズン表から数える (シーズン表を読み直さない)
+    return epl_data.compact_team_frame(epl_source.derive_team_table(_load_epl_data(version), get_source().teams()))
+
+def load_team_stats(version):
+    return shared_frames.view(_load_team_stats(version))
+
+# シーズン・チーム別の行位置インデックス (フィルタ結果をメモ化するためプロセス内で共有)
+@st.cache_resource(max_entries=4)
+def load_filter_index(version):
+    return epl_data.FilterIndex(load_epl_data(version))
+
+# フィルタ状態ごとの集計結果を共有 (key はフィルタ選択とデータバージョンのハッシュ、"all:" は全データ)
+@st.cache_resource(max_entries=128)
+def load_aggregates(key, _df):
+    return epl_aggregate.aggregate(_df)
+
+# 優勝争いシミュレーションのワーカープロセス (EPL_SIM_WORKERS で数を指定、既定は CPU 数)
+@st.cache_resource
+def get_simulation_pool():
+    # スレッドを持つ Streamlit のプロセスを fork しないよう、forkserver (なければ spawn) で起動する
+    methods = multiprocessing.get_all_start_methods()
+    return ProcessPoolExecutor(
+        max_workers=int(os.environ.get("EPL_SIM_WORKERS", 0)) or os.cpu_count(),
+        mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+    )
+
+# シミュレーション結果は入力 (データバージョン・参加チーム・各パラメータ) ごとに共有
+@st.cache_data(max_entries=32, show_spinner="シーズンをシミュレーション中...")
+def simulate_title_race(version, teams, seasons, seed, league_goals, home_advantage):
+    rates = epl_simulate.team_rates(load_team_stats(version))
+    rates = rates[rates["チーム"].isin(teams)]
+    return epl_simulate.simulate(
+        rates, seasons, seed, league_goals, home_advantage, executor=get_simulation_pool()
+    )
+
+@st.cache_data(max_entries=4)
+def load_memory_report(version):
+    # 変換前の表は保持していないため、各表を1回ずつ読み直して比べる
+    source = get_source()
+    seasons = source.seasons()
+    return epl_data.memory_report({
+        "seasons": (seasons, epl_data.compact_season_frame),
+        "teams": (epl_source.derive_team_table(seasons, source.teams()), epl_data.compact_team_frame),
+    })
+
+epl_profile.begin_script()
+epl_charts.reset_timings()
 
 # メインタイトル
 st.markdown('<h1 class="main-header">⚽ PREMIER LEAGUE CHAMPIONS</h1>', unsafe_allow_html=True)
 st.markdown('<div class="football-field"></div>', unsafe_allow_html=True)
 
 # データロード
-df = load_epl_data()
-team_df = load_team_stats()
+data_version = load_data_version()
+df = load_epl_data(data_version)
+team_df = load_team_stats(data_version)
 
 # サイドバー
 st.sidebar.markdown("## ⚽ フィルター設定")
@@ -171,54 +130,26 @@ selected_seasons = st.sidebar.multiselect(
 # チーム選択
 selected_teams = st.sidebar.multiselect(
     "チームを選択:",
-    options=df["優勝チーム"].unique(),
-    default=df["優勝チーム"].unique()
+    options=df["優勝チーム"].unique().tolist(),
+    default=df["優勝チーム"].unique().tolist()
 )
 
-# データフィルタリング
-filtered_df = df[
-    (df["シーズン"].isin(selected_seasons)) &
-    (df["優勝チーム"].isin(selected_teams))
-]
-
-# メトリクスカード
-col1, col2, col3, col4 = st.columns(4)
+# データフィルタリング (インデックスで選択行の位置を求める)
+filter_index = load_filter_index(data_version)
+filtered_df = df.iloc[filter_index.rows(selected_seasons, selected_teams)]
+filter_key = epl_charts.selection_key(selected_seasons, selected_teams, [data_version])
 
-with col1:
-    total_seasons = len(filtered_df)
-    st.markdown(f"""
-    <div class="metric-card">
-        <h3>🏆 総シーズン数</h3>
-        <h2>{total_seasons}</h2>
-    </div>
-    """, unsafe_allow_html=True)
+# フィルタ状態ごとの集計 (メトリクス・各タブで共通)
+aggregates = load_aggregates(filter_key, filtered_df)
+summary = aggregates["summary"]
 
-with col2:
-    avg_goals = filtered_df["得点"].mean()
-    st.markdown(f"""
-    <div class="metric-card">
-        <h3>⚽ 平均得点数</h3>
-        <h2>{avg_goals:.1f}</h2>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col3:
-    max_points = filtered_df["勝ち点"].max()
-    st.markdown(f"""
-    <div class="metric-card">
-        <h3>📊 最高勝ち点</h3>
-        <h2>{max_points}</h2>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col4:
-    avg_attendance = filtered_df["平均観客数"].mean()
-    st.markdown(f"""
-    <div class="metric-card">
-        <h3>👥 平均観客数</h3>
-        <h2>{avg_attendance:,.0f}</h2>
-    </div>
-    """, unsafe_allow_html=True)
+# メトリクスカード (4枚を1回の描画で送る)
+st.markdown(epl_cards.metric_cards_html([
+    ("🏆 総シーズン数", summary["seasons"]),
+    ("⚽ 平均得点数", f"{summary['avg_goals']:.1f}"),
+    ("📊 最高勝ち点", summary["max_points"]),
+    ("👥 平均観客数", f"{summary['avg_attendance']:,.0f}"),
+]), unsafe_allow_html=True)
 
 st.markdown('<div class="football-field"></div>', unsafe_allow_html=True)
 
@@ -227,134 +158,55 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("### 🏆 シーズン別勝ち点推移")
-    fig_line = px.line(
-        filtered_df,
-        x="シーズン",
-        y="勝ち点",
-        color="優勝チーム",
-        markers=True,
-        title="優勝チームの勝ち点推移",
-        color_discrete_sequence=px.colors.qualitative.Set1
-    )
-    fig_line.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        height=500,
-        xaxis_tickangle=-45
-    )
-    fig_line.update_xaxes(gridcolor='rgba(128,128,128,0.2)')
-    fig_line.update_yaxes(gridcolor='rgba(128,128,128,0.2)')
-    st.plotly_chart(fig_line, use_container_width=True)
+    epl_charts.plotly_chart("season_points", filtered_df, filter_key)
 
 with col2:
     st.markdown("### 👑 チーム別優勝回数")
-    team_wins = filtered_df.groupby("優勝チーム").size().sort_values(ascending=True)
-    
-    fig_bar = px.bar(
-        x=team_wins.values,
-        y=team_wins.index,
-        orientation='h',
-        title="チーム別優勝回数 (2000年以降)",
-        color=team_wins.values,
-        color_continuous_scale="Greens"
-    )
-    fig_bar.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        height=500,
-        showlegend=False
-    )
-    fig_bar.update_xaxes(gridcolor='rgba(128,128,128,0.2)')
-    fig_bar.update_yaxes(gridcolor='rgba(128,128,128,0.2)')
-    st.plotly_chart(fig_bar, use_container_width=True)
+    epl_charts.plotly_chart("team_titles", filtered_df, filter_key)
 
 # 2段目チャート
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("### ⚽ 得点 vs 失点 分析")
-    fig_scatter = px.scatter(
-        filtered_df,
-        x="得点",
-        y="失点",
-        size="勝ち点",
-        color="優勝チーム",
-        hover_name="優勝チーム",
-        hover_data=["シーズン", "勝ち点"],
-        title="得点 vs 失点 (勝ち点でサイズ決定)",
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    fig_scatter.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        height=500
-    )
-    fig_scatter.update_xaxes(gridcolor='rgba(128,128,128,0.2)')
-    fig_scatter.update_yaxes(gridcolor='rgba(128,128,128,0.2)')
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    epl_charts.plotly_chart("goals_scatter", filtered_df, filter_key)
 
 with col2:
     st.markdown("### 🎯 得点王ゴール数推移")
-    fig_goals = px.bar(
-        filtered_df,
-        x="シーズン",
-        y="得点王ゴール数",
-        color="得点王ゴール数",
-        title="シーズン別得点王ゴール数",
-        color_continuous_scale="Reds",
-        hover_data=["得点王"]
-    )
-    fig_goals.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        height=500,
-        xaxis_tickangle=-45,
-        showlegend=False
-    )
-    fig_goals.update_xaxes(gridcolor='rgba(128,128,128,0.2)')
-    fig_goals.update_yaxes(gridcolor='rgba(128,128,128,0.2)')
-    st.plotly_chart(fig_goals, use_container_width=True)
+    epl_charts.plotly_chart("top_scorer_goals", filtered_df, filter_key)
 
 st.markdown('<div class="football-field"></div>', unsafe_allow_html=True)
 
 # 詳細統計
 st.markdown("### 📊 詳細統計とランキング")
 
-# タブで区分
-tab1, tab2, tab3, tab4 = st.tabs(["🏆 優勝チーム詳細", "⚽ 得点王ランキング", "🥅 GK統計", "📋 全データ"])
-
-with tab1:
+# タブで区分 (各タブはフラグメントとして、タブ内のウィジェット変更時はそのタブだけ再実行)
+@epl_profile.fragment("tab1: 優勝チーム詳細")
+def team_detail_tab(df, filter_index, filtered_df, filter_key, selected_seasons, aggregates):
     st.markdown("#### 👑 優勝チーム別詳細分析")
     
     selected_team = st.selectbox(
         "チームを選択:",
-        options=filtered_df["優勝チーム"].unique()
+        options=filtered_df["優勝チーム"].unique().tolist()
     )
     
-    team_data = filtered_df[filtered_df["優勝チーム"] == selected_team]
-    
-    if not team_data.empty:
+    if selected_team in aggregates["teams"].index:
+        team_stats = aggregates["teams"].loc[selected_team]
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            total_titles = len(team_data)
-            avg_points = team_data["勝ち点"].mean()
             st.markdown(f"""
             <div class="team-card">
                 <div class="team-name">{selected_team}</div>
-                <p><strong>優勝回数:</strong> {total_titles}回</p>
-                <p><strong>平均勝ち点:</strong> {avg_points:.1f}</p>
-                <p><strong>最高勝ち点:</strong> {team_data["勝ち点"].max()}</p>
+                <p><strong>優勝回数:</strong> {team_stats["優勝回数"]}回</p>
+                <p><strong>平均勝ち点:</strong> {team_stats["平均勝ち点"]:.1f}</p>
+                <p><strong>最高勝ち点:</strong> {team_stats["最高勝ち点"]}</p>
             </div>
             """, unsafe_allow_html=True)
         
         with col2:
-            avg_goals_for = team_data["得点"].mean()
-            avg_goals_against = team_data["失点"].mean()
+            avg_goals_for = team_stats["平均得点"]
+            avg_goals_against = team_stats["平均失点"]
             st.markdown(f"""
             <div class="team-card">
                 <div class="team-name">攻守バランス</div>
@@ -365,118 +217,59 @@ with tab1:
             """, unsafe_allow_html=True)
         
         with col3:
-            recent_season = team_data.iloc[0]["シーズン"]
-            recent_points = team_data.iloc[0]["勝ち点"]
             st.markdown(f"""
             <div class="team-card">
                 <div class="team-name">最新記録</div>
-                <p><strong>最新優勝:</strong> {recent_season}</p>
-                <p><strong>その時の勝ち点:</strong> {recent_points}</p>
-                <p><strong>最高得点:</strong> {team_data["得点"].max()}</p>
+                <p><strong>最新優勝:</strong> {team_stats["最新優勝"]}</p>
+                <p><strong>その時の勝ち点:</strong> {team_stats["最新勝ち点"]}</p>
+                <p><strong>最高得点:</strong> {team_stats["最高得点"]}</p>
             </div>
             """, unsafe_allow_html=True)
         
         # チーム成績チャート
-        fig_team = px.bar(
-            team_data,
-            x="シーズン",
-            y=["得点", "失点"],
-            title=f"{selected_team}の得点・失点推移",
-            barmode="group",
-            color_discrete_sequence=["#00B04F", "#FF0040"]
-        )
-        fig_team.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            height=400,
-            xaxis_tickangle=-45
-        )
-        st.plotly_chart(fig_team, use_container_width=True)
-
-with tab2:
+        team_data = df.iloc[filter_index.rows(selected_seasons, [selected_team])]
+        epl_charts.plotly_chart("team_goals", team_data, filter_key, team=selected_team)
+
+@epl_profile.fragment("tab2: 得点王ランキング")
+def scorer_tab(filtered_df, filter_key, aggregates):
     st.markdown("#### ⚽ 得点王ランキング & 統計")
     
     col1, col2 = st.columns(2)
     
     with col1:
         # 得点王別総ゴール数
-        scorer_stats = filtered_df.groupby("得点王").agg({
-            "得点王ゴール数": ["sum", "mean", "count"]
-        }).round(1)
-        scorer_stats.columns = ["総ゴール数", "平均ゴール数", "得点王回数"]
-        scorer_stats = scorer_stats.sort_values("総ゴール数", ascending=False).head(10)
-        
-        st.markdown("**🏅 歴代得点王ランキング (Top 10)**")
-        for idx, (player, stats) in enumerate(scorer_stats.iterrows(), 1):
-            rank_emoji = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉" if idx == 3 else f"{idx}."
-            st.markdown(f"""
-            <div class="team-card">
-                <div class="player-name">{rank_emoji} {player}</div>
-                <p><strong>総ゴール数:</strong> {stats['総ゴール数']:.0f} | <strong>平均:</strong> {stats['平均ゴール数']:.1f} | <strong>得点王:</strong> {stats['得点王回数']:.0f}回</p>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown("**🏅 歴代得点王ランキング**")
+        epl_cards.render_ranking(aggregates["scorers"], [
+            ("総ゴール数", "総ゴール数", ".0f", ""),
+            ("平均", "平均ゴール数", ".1f", ""),
+            ("得点王", "得点王回数", ".0f", "回"),
+        ], key="scorer_page", page_size=10)
     
     with col2:
         # 得点王ゴール数分布
-        fig_goals_dist = px.histogram(
-            filtered_df,
-            x="得点王ゴール数",
-            nbins=15,
-            title="得点王ゴール数分布",
-            color_discrete_sequence=["#00B04F"]
-        )
-        fig_goals_dist.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            height=400
-        )
-        st.plotly_chart(fig_goals_dist, use_container_width=True)
-
-with tab3:
+        epl_charts.plotly_chart("top_scorer_goals_dist", filtered_df, filter_key)
+
+@epl_profile.fragment("tab3: GK統計")
+def keeper_tab(filtered_df, filter_key, aggregates):
     st.markdown("#### 🥅 ゴールキーパー統計")
     
     col1, col2 = st.columns(2)
     
     with col1:
         # クリーンシート王統計
-        gk_stats = filtered_df.groupby("クリーンシート王").agg({
-            "クリーンシート数": ["sum", "mean", "count"]
-        }).round(1)
-        gk_stats.columns = ["総クリーンシート", "平均クリーンシート", "受賞回数"]
-        gk_stats = gk_stats.sort_values("総クリーンシート", ascending=False).head(8)
-        
         st.markdown("**🧤 歴代クリーンシート王ランキング**")
-        for idx, (gk, stats) in enumerate(gk_stats.iterrows(), 1):
-            rank_emoji = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉" if idx == 3 else f"{idx}."
-            st.markdown(f"""
-            <div class="team-card">
-                <div class="player-name">{rank_emoji} {gk}</div>
-                <p><strong>総CS:</strong> {stats['総クリーンシート']:.0f} | <strong>平均:</strong> {stats['平均クリーンシート']:.1f} | <strong>受賞:</strong> {stats['受賞回数']:.0f}回</p>
-            </div>
-            """, unsafe_allow_html=True)
+        epl_cards.render_ranking(aggregates["keepers"], [
+            ("総CS", "総クリーンシート", ".0f", ""),
+            ("平均", "平均クリーンシート", ".1f", ""),
+            ("受賞", "受賞回数", ".0f", "回"),
+        ], key="keeper_page", page_size=8)
     
     with col2:
         # クリーンシート数推移
-        fig_cs = px.line(
-            filtered_df,
-            x="シーズン",
-            y="クリーンシート数",
-            title="クリーンシート数推移",
-            markers=True,
-            color_discrete_sequence=["#00B04F"]
-        )
-        fig_cs.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            height=400,
-            xaxis_tickangle=-45
-        )
-        st.plotly_chart(fig_cs, use_container_width=True)
-
-with tab4:
+        epl_charts.plotly_chart("clean_sheets", filtered_df, filter_key)
+
+@epl_profile.fragment("tab4: 全データ")
+def full_data_tab(filtered_df, filter_key):
     st.markdown("#### 📋 全シーズンデータ")
     
     # ソートオプション
@@ -491,23 +284,88 @@ with tab4:
         horizontal=True
     )
     
-    sorted_df = filtered_df.sort_values(
-        by=sort_column,
-        ascending=(sort_order == "昇順")
-    )
-    
-    # スタイリングされたデータフレーム
-    st.dataframe(
-        sorted_df.style.format({
+    # スタイリングされたデータフレーム (表示ページのみ整形)
+    epl_table.paged_table(
+        filtered_df,
+        filter_key,
+        sort_column,
+        ascending=(sort_order == "昇順"),
+        formats={
             "平均観客数": "{:,}",
             "勝ち点": "{:.0f}",
             "得点": "{:.0f}",
             "失点": "{:.0f}"
-        }).background_gradient(subset=["勝ち点", "得点", "得点王ゴール数"], cmap="Greens"),
+        },
+        gradient_columns=["勝ち点", "得点", "得点王ゴール数"],
+    )
+
+@epl_profile.fragment("tab5: 優勝シミュレーション")
+def title_race_tab(team_df, data_version):
+    st.markdown("#### 🔮 優勝争いシミュレーション")
+    st.caption("通算の総得点・総失点から各チームの攻撃力・守備力を求め、全試合の得点をポアソン分布で引いてシーズンを繰り返します。")
+
+    teams = epl_simulate.team_rates(team_df)["チーム"].tolist()
+    if len(teams) < 2:
+        st.warning("総得点・総失点のあるチームが2チーム以上必要です。")
+        return
+
+    # 計算はフォームの送信時だけ行う (初期表示では計算しない)
+    with st.form("title_race"):
+        selected = st.multiselect("参加チーム:", options=teams, default=teams)
+        col1, col2 = st.columns(2)
+        with col1:
+            seasons = st.select_slider(
+                "シミュレーションするシーズン数:",
+                options=[10_000, 50_000, 100_000, 200_000, 500_000],
+                value=100_000,
+            )
+            seed = st.number_input("乱数シード:", min_value=0, value=0, step=1)
+        with col2:
+            league_goals = st.slider("1チーム1試合あたりの平均得点:", 0.8, 2.0, epl_simulate.LEAGUE_GOALS, 0.05)
+            home_advantage = st.slider("ホームの得点倍率:", 1.0, 1.5, epl_simulate.HOME_ADVANTAGE, 0.05)
+        if st.form_submit_button("シミュレーション実行"):
+            st.session_state["title_race_params"] = (tuple(selected), seasons, int(seed), league_goals, home_advantage)
+
+    params = st.session_state.get("title_race_params")
+    if params is None:
+        st.info("条件を選んで「シミュレーション実行」を押してください。")
+        return
+    if len(params[0]) < 2:
+        st.warning("2チーム以上を選んでください。")
+        return
+
+    result = simulate_title_race(data_version, *params)
+    key = epl_charts.selection_key(params[0], [*params[1:], data_version])
+    epl_charts.plotly_chart("title_odds", result, key)
+    st.dataframe(
+        result.style.format({
+            "優勝確率": "{:.1%}",
+            "上位4位確率": "{:.1%}",
+            "平均順位": "{:.2f}",
+            "平均勝ち点": "{:.1f}",
+            "勝ち点標準偏差": "{:.1f}",
+        }),
+        hide_index=True,
         use_container_width=True,
-        height=500
     )
 
+TABS = {
+    "🏆 優勝チーム詳細": lambda: team_detail_tab(df, filter_index, filtered_df, filter_key, selected_seasons, aggregates),
+    "⚽ 得点王ランキング": lambda: scorer_tab(filtered_df, filter_key, aggregates),
+    "🥅 GK統計": lambda: keeper_tab(filtered_df, filter_key, aggregates),
+    "📋 全データ": lambda: full_data_tab(filtered_df, filter_key),
+    "🔮 優勝シミュレーション": lambda: title_race_tab(team_df, data_version),
+}
+
+if FAST_START:
+    # st.tabs は全タブの中身を毎回構築するため、選択中のタブだけを描画する
+    selected_tab = st.radio("表示するタブ", list(TABS), horizontal=True, label_visibility="collapsed", key="epl_tab")
+    TABS[selected_tab]()
+else:
+    for tab, render_tab in zip(st.tabs(list(TABS)), TABS.values()):
+        with tab:
+            render_tab()
+
 # サイドバー情報
 st.sidebar.markdown('<div class="football-field"></div>', unsafe_allow_html=True)
 st.sidebar.markdown("### ⚽ ダッシュボード情報")
@@ -534,13 +392,24 @@ st.sidebar.markdown("""
 """)
 
 st.sidebar.markdown("### 📈 記録")
+records = load_aggregates(f"all:{data_version}", df)["records"]
 st.sidebar.markdown(f"""
-- **最高勝ち点**: {df['勝ち点'].max()}点 (Man City)
-- **最多得点**: {df['得点'].max()}得点 (Man City) 
-- **最少失点**: {df['失点'].min()}失点 (Chelsea)
-- **最多ゴール**: {df['得点王ゴール数'].max()}得点 ({df.loc[df['得点王ゴール数'].idxmax(), '得点王']})
+- **最高勝ち点**: {records['max_points'][0]}点 ({records['max_points'][1]})
+- **最多得点**: {records['max_goals'][0]}得点 ({records['max_goals'][1]}) 
+- **最少失点**: {records['min_conceded'][0]}失点 ({records['min_conceded'][1]})
+- **最多ゴール**: {records['max_scorer_goals'][0]}得点 ({records['max_scorer_goals'][1]})
 """)
 
+st.sidebar.markdown("### 💾 メモリ使用量")
+if not FAST_START or st.sidebar.checkbox("メモリ使用量を計算"):
+    st.sidebar.markdown("\n".join(
+        f"- **{name}**: {usage['before']:,} → {usage['after']:,} bytes"
+        for name, usage in load_memory_report(data_version).items()
+    ))
+
+epl_charts.show_timings(st.sidebar)
+epl_profile.show(st.sidebar)
+
 # フッター
 st.markdown('<div class="football-field"></div>', unsafe_allow_html=True)
 st.markdown("""
@@ -549,4 +418,6 @@ st.markdown("""
     <p style="color: #00FF41;">🏆 Excellence • Passion • Glory 🏆</p>
     <p>データ期間: 2000-2023シーズン | 最終更新: {}</p>
 </div>
-""".format(datetime.now().strftime("%Y年%m月%d日 %H:%M")), unsafe_allow_html=True)
\ No newline at end of file
+""".format(datetime.now().strftime("%Y年%m月%d日 %H:%M")), unsafe_allow_html=True)
+
+epl_profile.end_script()
@@ -0,0 +1,52 @@
+SCORER_COLUMNS = ["総ゴール数", "平均ゴール数", "得点王回数"]
+KEEPER_COLUMNS = ["総クリーンシート", "平均クリーンシート", "受賞回数"]
+
+
+def _leaderboard(df, by, value, columns):
+    stats = df.groupby(by, observed=True)[value].agg(["sum", "mean", "count"]).round(1)
+    stats.columns = columns
+    return stats.sort_values(columns[0], ascending=False)
+
+
+def _record(df, column, pick, label_column):
+    # 最大値・最小値と、その行の名前 (同値は先頭の行)
+    if df.empty:
+        return None, None
+    values = df[column].to_numpy()
+    pos = values.argmax() if pick == "max" else values.argmin()
+    return values[pos], df[label_column].iloc[pos]
+
+
+def aggregate(df):
+    """フィルタ後の DataFrame から全タブ・サイドバーで使う集計をまとめて計算する
+
+    チーム・得点王・GKはそれぞれ1回のグループ集計で必要な統計量をすべて求める。
+    """
+    teams = df.groupby("優勝チーム", observed=True, sort=False).agg(
+        優勝回数=("勝ち点", "size"),
+        平均勝ち点=("勝ち点", "mean"),
+        最高勝ち点=("勝ち点", "max"),
+        平均得点=("得点", "mean"),
+        平均失点=("失点", "mean"),
+        最高得点=("得点", "max"),
+        最新優勝=("シーズン", "first"),
+        最新勝ち点=("勝ち点", "first"),
+    )
+    return {
+        "summary": {
+            "seasons": len(df),
+            "avg_goals": df["得点"].mean(),
+            "max_points": df["勝ち点"].max(),
+            "avg_attendance": df["平均観客数"].mean(),
+        },
+        "teams": teams,
+        "scorers": _leaderboard(df, "得点王", "得点王ゴール数", SCORER_COLUMNS),
+        "keepers": _leaderboard(df, "クリーンシート王", "クリーンシート数", KEEPER_COLUMNS),
+        "records": {
+            "max_points": _record(df, "勝ち点", "max", "優勝チーム"),
+            "max_goals": _record(df, "得点", "max", "優勝チーム"),
+            "min_conceded": _record(df, "失点", "min", "優勝チーム"),
+            "max_scorer_goals": _record(df, "得点王ゴール数", "max", "得点王"),
+        },
+    }
+
@@ -0,0 +1,58 @@
+import html
+import math
+
+import streamlit as st
+
+RANK_LABELS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+
+def rank_label(rank):
+    return RANK_LABELS.get(rank, f"{rank}.")
+
+
+def metric_cards_html(cards):
+    # cards: [(見出し, 表示値)] を1つのグリッドにまとめる
+    items = "".join(
+        f'<div class="metric-card"><h3>{title}</h3><h2>{value}</h2></div>'
+        for title, value in cards
+    )
+    return f'<div class="metric-grid">{items}</div>'
+
+
+def ranking_html(names, fields, start=1):
+    """ランキングのカードHTMLを1回の走査でまとめて作る
+
+    fields: [(ラベル, 値の配列, 書式, 接尾辞)]
+    """
+    # 列ごとにまとめて文字列化してから行方向に結合
+    formatted = [
+        [f"<strong>{label}:</strong> {format(value, fmt)}{suffix}" for value in values]
+        for label, values, fmt, suffix in fields
+    ]
+    cards = [
+        f'<div class="team-card"><div class="player-name">{rank_label(rank)} {html.escape(str(name))}</div>'
+        f'<p>{" | ".join(stats)}</p></div>'
+        for rank, name, *stats in zip(range(start, start + len(names)), names, *formatted)
+    ]
+    return "".join(cards)
+
+
+def render_ranking(ranking, fields, key, page_size=10):
+    """ランキング (index が名前、並べ替え済み) をページ単位で1要素として描画する
+
+    fields: [(ラベル, 列名, 書式, 接尾辞)]
+    """
+    pages = max(1, math.ceil(len(ranking) / page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"ページ (全{pages}ページ)", min_value=1, max_value=pages, value=1, key=key)
+    offset = (page - 1) * page_size
+    chunk = ranking.iloc[offset:offset + page_size]
+    st.markdown(
+        ranking_html(
+            chunk.index.tolist(),
+            [(label, chunk[column].to_numpy(), fmt, suffix) for label, column, fmt, suffix in fields],
+            start=offset + 1,
+        ),
+        unsafe_allow_html=True,
+    )
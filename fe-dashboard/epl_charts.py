@@ -0,0 +1,223 @@
+import functools
+import hashlib
+import threading
+import time
+
+import streamlit as st
+
+import chart_reduce
+
+DEFAULT_THEME = "epl_dark"
+GRID_COLOR = 'rgba(128,128,128,0.2)'
+
+
+# 共通テンプレート (チャートごとの背景・文字色・グリッド設定を一本化)
+# {テーマ名: (元テンプレート, レイアウト)}
+THEMES = {
+    "epl_dark": ("plotly", dict(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        xaxis=dict(gridcolor=GRID_COLOR),
+        yaxis=dict(gridcolor=GRID_COLOR),
+    )),
+}
+
+
+def _px():
+    # plotly.express は import が重いため、最初のチャート構築時に読み込む
+    import plotly.express as px
+
+    return px
+
+
+@functools.lru_cache(maxsize=None)
+def theme_template(theme):
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    base, layout = THEMES[theme]
+    result = go.layout.Template(pio.templates[base])
+    result.layout.update(layout)
+    return result
+
+
+def selection_key(*selections):
+    # フィルタ選択内容 (順不同) から安定したキャッシュキーを作る
+    normalized = [sorted(map(str, values)) for values in selections]
+    return hashlib.sha1(repr(normalized).encode("utf-8")).hexdigest()
+
+
+def season_points_line(df, template):
+    px = _px()
+    # 行数が多い場合はチームごとに間引き、WebGL で描画
+    df = chart_reduce.reduce_frame(df, "シーズン", "勝ち点", by="優勝チーム")
+    fig = px.line(
+        df,
+        x="シーズン",
+        y="勝ち点",
+        color="優勝チーム",
+        markers=True,
+        title="優勝チームの勝ち点推移",
+        color_discrete_sequence=px.colors.qualitative.Set1,
+        render_mode=chart_reduce.render_mode(len(df)),
+        template=template
+    )
+    return fig.update_layout(height=500, xaxis_tickangle=-45)
+
+
+def team_titles_bar(df, template):
+    px = _px()
+    team_wins = df.groupby("優勝チーム", observed=True).size().sort_values(ascending=True)
+    fig = px.bar(
+        x=team_wins.values,
+        y=team_wins.index,
+        orientation='h',
+        title="チーム別優勝回数 (2000年以降)",
+        color=team_wins.values,
+        color_continuous_scale="Greens",
+        template=template
+    )
+    return fig.update_layout(height=500, showlegend=False)
+
+
+def goals_scatter(df, template):
+    px = _px()
+    fig = px.scatter(
+        df,
+        x="得点",
+        y="失点",
+        size="勝ち点",
+        color="優勝チーム",
+        hover_name="優勝チーム",
+        hover_data=["シーズン", "勝ち点"],
+        title="得点 vs 失点 (勝ち点でサイズ決定)",
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        render_mode=chart_reduce.render_mode(len(df)),
+        template=template
+    )
+    return fig.update_layout(height=500)
+
+
+def top_scorer_goals_bar(df, template):
+    px = _px()
+    fig = px.bar(
+        df,
+        x="シーズン",
+        y="得点王ゴール数",
+        color="得点王ゴール数",
+        title="シーズン別得点王ゴール数",
+        color_continuous_scale="Reds",
+        hover_data=["得点王"],
+        template=template
+    )
+    return fig.update_layout(height=500, xaxis_tickangle=-45, showlegend=False)
+
+
+def team_goals_bar(df, template, team):
+    px = _px()
+    fig = px.bar(
+        df,
+        x="シーズン",
+        y=["得点", "失点"],
+        title=f"{team}の得点・失点推移",
+        barmode="group",
+        color_discrete_sequence=["#00B04F", "#FF0040"],
+        template=template
+    )
+    return fig.update_layout(height=400, xaxis_tickangle=-45)
+
+
+def top_scorer_goals_histogram(df, template):
+    px = _px()
+    fig = px.histogram(
+        df,
+        x="得点王ゴール数",
+        nbins=15,
+        title="得点王ゴール数分布",
+        color_discrete_sequence=["#00B04F"],
+        template=template
+    )
+    return fig.update_layout(height=400)
+
+
+def clean_sheets_line(df, template):
+    px = _px()
+    df = chart_reduce.reduce_frame(df, "シーズン", "クリーンシート数")
+    fig = px.line(
+        df,
+        x="シーズン",
+        y="クリーンシート数",
+        title="クリーンシート数推移",
+        markers=True,
+        color_discrete_sequence=["#00B04F"],
+        render_mode=chart_reduce.render_mode(len(df)),
+        template=template
+    )
+    return fig.update_layout(height=400, xaxis_tickangle=-45)
+
+
+def title_odds_bar(df, template):
+    px = _px()
+    df = df.sort_values("優勝確率")
+    fig = px.bar(
+        df,
+        x="優勝確率",
+        y="チーム",
+        orientation='h',
+        title="優勝確率 (シミュレーション)",
+        color="優勝確率",
+        color_continuous_scale="Greens",
+        text_auto=".1%",
+        template=template
+    )
+    fig.update_xaxes(tickformat=".0%")
+    return fig.update_layout(height=400)
+
+
+CHARTS = {
+    "season_points": season_points_line,
+    "team_titles": team_titles_bar,
+    "goals_scatter": goals_scatter,
+    "top_scorer_goals": top_scorer_goals_bar,
+    "team_goals": team_goals_bar,
+    "top_scorer_goals_dist": top_scorer_goals_histogram,
+    "clean_sheets": clean_sheets_line,
+    "title_odds": title_odds_bar,
+}
+
+_build = threading.local()
+
+
+# 完成したチャートをプロセス内で共有 (データ本体はキーに含めず、選択内容のキーで識別)
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _cached_figure(kind, key, theme, _data, params):
+    _build.built = True
+    return CHARTS[kind](_data, theme_template(theme), **dict(params))
+
+
+def figure(kind, data, key, theme=DEFAULT_THEME, **params):
+    _build.built = False
+    start = time.perf_counter()
+    fig = _cached_figure(kind, key, theme, data, tuple(sorted(params.items())))
+    timings = st.session_state.setdefault("chart_timings", {})
+    timings[kind] = {"ms": round((time.perf_counter() - start) * 1000, 2), "built": _build.built}
+    return fig
+
+
+def plotly_chart(kind, data, key, theme=DEFAULT_THEME, **params):
+    fig = figure(kind, data, key, theme, **params)
+    start = time.perf_counter()
+    st.plotly_chart(fig, use_container_width=True)
+    # Streamlit 側のシリアライズ時間
+    st.session_state["chart_timings"][kind]["render_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def reset_timings():
+    st.session_state["chart_timings"] = {}
+
+
+def show_timings(container):
+    # 今回の再実行でのチャートごとの取得時間 (built=True は新規構築)
+    with container.expander("⏱ チャート構築時間"):
+        st.json(st.session_state.get("chart_timings", {}))
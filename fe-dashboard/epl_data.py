@@ -0,0 +1,122 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# EPL優勝シーズンの元データ (新しいシーズン順)
+SEASON_DATA = {
+    "シーズン": ["2022-23", "2021-22", "2020-21", "2019-20", "2018-19", "2017-18", "2016-17", "2015-16", "2014-15", "2013-14", "2012-13", "2011-12", "2010-11", "2009-10", "2008-09", "2007-08", "2006-07", "2005-06", "2004-05", "2003-04", "2002-03", "2001-02", "2000-01"],
+    "優勝チーム": ["Manchester City", "Manchester City", "Manchester City", "Liverpool", "Manchester City", "Manchester City", "Chelsea", "Leicester City", "Chelsea", "Manchester City", "Manchester United", "Manchester City", "Manchester United", "Chelsea", "Manchester United", "Manchester United", "Manchester United", "Chelsea", "Chelsea", "Arsenal", "Manchester United", "Arsenal", "Manchester United"],
+    "勝ち点": [89, 93, 86, 99, 98, 100, 93, 81, 87, 86, 89, 89, 80, 86, 90, 87, 89, 91, 95, 90, 83, 87, 80],
+    "得点": [89, 99, 83, 85, 95, 106, 85, 68, 73, 102, 86, 93, 78, 103, 68, 80, 83, 72, 72, 73, 74, 79, 79],
+    "失点": [31, 26, 32, 33, 23, 27, 33, 36, 32, 37, 43, 29, 37, 32, 24, 22, 27, 22, 15, 26, 34, 36, 31],
+    "得点王": ["Erling Haaland", "Mohamed Salah", "Harry Kane", "Jamie Vardy", "Pierre-Emerick Aubameyang", "Mohamed Salah", "Harry Kane", "Harry Kane", "Sergio Aguero", "Luis Suarez", "Robin van Persie", "Robin van Persie", "Carlos Tevez", "Didier Drogba", "Nicolas Anelka", "Cristiano Ronaldo", "Didier Drogba", "Thierry Henry", "Thierry Henry", "Thierry Henry", "Ruud van Nistelrooy", "Thierry Henry", "Jimmy Floyd Hasselbaink"],
+    "得点王ゴール数": [36, 23, 23, 23, 22, 32, 29, 25, 26, 31, 26, 30, 20, 29, 19, 31, 20, 27, 25, 30, 25, 24, 23],
+    "アシスト王": ["Kevin De Bruyne", "Mohamed Salah", "Harry Kane", "Kevin De Bruyne", "Eden Hazard", "Kevin De Bruyne", "Kevin De Bruyne", "Mesut Ozil", "Cesc Fabregas", "Steven Gerrard", "Juan Mata", "Frank Lampard", "Nani", "Frank Lampard", "Ryan Giggs", "Cesc Fabregas", "Cesc Fabregas", "Frank Lampard", "Frank Lampard", "Thierry Henry", "David Beckham", "David Beckham", "David Beckham"],
+    "アシスト数": [16, 13, 14, 20, 15, 16, 18, 19, 18, 13, 12, 16, 18, 20, 11, 13, 13, 16, 13, 20, 13, 11, 12],
+    "クリーンシート王": ["Ederson", "Ederson", "Ederson", "Alisson", "Ederson", "Ederson", "Thibaut Courtois", "Petr Cech", "Petr Cech", "Wojciech Szczesny", "David de Gea", "Joe Hart", "Edwin van der Sar", "Petr Cech", "Edwin van der Sar", "Edwin van der Sar", "Petr Cech", "Petr Cech", "Petr Cech", "Jens Lehmann", "David Seaman", "David Seaman", "Fabien Barthez"],
+    "クリーンシート数": [20, 20, 19, 21, 20, 16, 16, 16, 16, 17, 18, 17, 18, 24, 21, 21, 24, 24, 24, 15, 15, 18, 13],
+    "平均観客数": [54234, 39121, 8456, 39567, 38491, 38374, 36675, 36451, 36176, 36695, 35931, 34601, 35363, 35631, 35440, 35107, 33875, 33373, 33688, 35464, 32157, 32659, 31487]
+}
+
+# チーム別の通算成績 (優勝回数はシーズン表から導出するため持たない)
+TEAM_STATS = {
+    "チーム": ["Manchester City", "Manchester United", "Chelsea", "Arsenal", "Liverpool", "Leicester City", "Tottenham", "Everton"],
+    "総得点": [2156, 1847, 1654, 1789, 1523, 1234, 1456, 1298],
+    "総失点": [674, 789, 723, 834, 567, 678, 745, 892],
+    "平均勝ち点": [82.4, 74.2, 76.8, 69.3, 71.5, 52.3, 64.7, 58.9],
+    "最高順位": [1, 1, 1, 1, 1, 1, 2, 4],
+    "最低順位": [8, 7, 10, 12, 8, 20, 15, 17]
+}
+
+# 名前の列はカテゴリ型で保持
+SEASON_CATEGORY_COLUMNS = ["優勝チーム", "得点王", "アシスト王", "クリーンシート王"]
+TEAM_CATEGORY_COLUMNS = ["チーム"]
+
+
+def season_ordinal(season):
+    # "2022-23" -> 2022 (シーズン開始年を時系列の序数として使う)
+    return int(season.split("-")[0])
+
+
+def _downcast(df, category_columns):
+    df = df.copy()
+    for col in df.columns:
+        if col in category_columns:
+            df[col] = df[col].astype("category")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="float")
+    return df
+
+
+def compact_season_frame(df):
+    # 数値は最小の型へ、名前はカテゴリ型へ、シーズンは時系列順の順序付きカテゴリへ変換し、
+    # インデックスをシーズン開始年にする (行の並びは元のまま)
+    df = _downcast(df, SEASON_CATEGORY_COLUMNS)
+    df["シーズン"] = pd.Categorical(
+        df["シーズン"], categories=sorted(df["シーズン"].unique(), key=season_ordinal), ordered=True
+    )
+    df.index = pd.Index(df["シーズン"].map(season_ordinal).astype("int32"), name="シーズン開始年")
+    return df
+
+
+def compact_team_frame(df):
+    return _downcast(df, TEAM_CATEGORY_COLUMNS)
+
+
+class FilterIndex:
+    """シーズン・チームごとの行位置インデックス
+
+    rows(seasons, teams) は選択の frozenset ごとにメモ化され、
+    選択行数の小さい側の行位置だけを走査して絞り込む。
+    """
+
+    def __init__(self, df, season_column="シーズン", team_column="優勝チーム"):
+        self.season_rows = self._positions(df[season_column])
+        self.team_rows = self._positions(df[team_column])
+        self._season_codes = self._codes(df[season_column])
+        self._team_codes = self._codes(df[team_column])
+        self._select = lru_cache(maxsize=256)(self._select_uncached)
+
+    @staticmethod
+    def _positions(column):
+        return {key: np.asarray(rows, dtype=np.int32) for key, rows in column.groupby(column, observed=True).indices.items()}
+
+    @staticmethod
+    def _codes(column):
+        categorical = column.astype("category")
+        return categorical.cat.codes.to_numpy(), {value: code for code, value in enumerate(categorical.cat.categories)}
+
+    def rows(self, seasons, teams):
+        return self._select(frozenset(seasons), frozenset(teams))
+
+    def _select_uncached(self, seasons, teams):
+        season_count = sum(len(self.season_rows.get(s, ())) for s in seasons)
+        team_count = sum(len(self.team_rows.get(t, ())) for t in teams)
+        # 行数の少ない側の行位置を集め、もう一方の条件はコード配列で判定
+        if season_count <= team_count:
+            keys, positions, (codes, lookup), other = seasons, self.season_rows, self._team_codes, teams
+        else:
+            keys, positions, (codes, lookup), other = teams, self.team_rows, self._season_codes, seasons
+        parts = [positions[k] for k in keys if k in positions]
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        candidates = np.sort(np.concatenate(parts))
+        wanted = np.array([lookup[v] for v in other if v in lookup], dtype=codes.dtype)
+        result = candidates[np.isin(codes[candidates], wanted)]
+        result.flags.writeable = False
+        return result
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(tables):
+    # tables: {名前: (元の DataFrame, 変換関数)} -> 変換前後のメモリ使用量 (バイト)
+    return {
+        name: {"before": frame_memory(raw), "after": frame_memory(compact(raw))}
+        for name, (raw, compact) in tables.items()
+    }
@@ -0,0 +1,114 @@
+import functools
+import logging
+import os
+import time
+from collections import deque
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+HISTORY = 50
+# 送信メッセージ数・バイト数の計測 (EPL_PROFILE=1 のときのみ、デバッグ用)
+# Streamlit の非公開 API (ScriptRunContext._enqueue) を差し替えて数えるため、バージョンによっては
+# 使えない。その場合は処理時間だけを記録する
+COUNT_MESSAGES = os.environ.get("EPL_PROFILE") == "1"
+
+
+def _history():
+    return st.session_state.setdefault("rerun_profile", deque(maxlen=HISTORY))
+
+
+class Measure:
+    """再実行の処理時間と、ブラウザへ送ったメッセージ数・バイト数の計測
+
+    メッセージ数・バイト数は COUNT_MESSAGES が有効で、送信関数を差し替えられた場合のみ記録する
+    (それ以外は None)。
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.messages = None
+        self.bytes = None
+        self._ctx = get_script_run_ctx() if COUNT_MESSAGES else None
+        self._enqueue = None
+
+    def _counting_enqueue(self, msg):
+        self.messages += 1
+        size = getattr(msg, "ByteSize", None)
+        if size is not None:
+            self.bytes += size()
+        self._enqueue(msg)
+
+    def start(self):
+        # ScriptRunContext の送信関数 (非公開) を差し替えて ForwardMsg のサイズを数える
+        enqueue = getattr(self._ctx, "_enqueue", None)
+        if callable(enqueue):
+            try:
+                self._ctx._enqueue = self._counting_enqueue
+            except AttributeError:
+                logger.warning("ScriptRunContext._enqueue cannot be replaced; counting timings only")
+            else:
+                self._enqueue = enqueue
+                self.messages = self.bytes = 0
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self, record=True):
+        elapsed = time.perf_counter() - self._started
+        if self._enqueue is not None:
+            self._ctx._enqueue = self._enqueue
+            self._enqueue = None
+        if not record:
+            return
+        _history().append({
+            "scope": self.scope,
+            "ms": round(elapsed * 1000, 2),
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "at": time.strftime("%H:%M:%S"),
+        })
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def begin_script():
+    # 前回の実行が例外で途中終了していた場合は、差し替えたままの送信関数を戻す
+    previous = st.session_state.get("_script_measure")
+    if previous is not None:
+        previous.stop(record=False)
+    st.session_state["_script_measure"] = Measure("script").start()
+
+
+def end_script():
+    measure = st.session_state.pop("_script_measure", None)
+    if measure is not None:
+        measure.stop()
+
+
+def fragment(scope):
+    # st.fragment として単独で再実行でき、実行ごとに計測結果を記録する
+    def decorate(func):
+        @st.fragment
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Measure(scope):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def show(container):
+    with container.expander("🔁 再実行プロファイル"):
+        history = list(_history())
+        if history:
+            st.dataframe(history[::-1], use_container_width=True)
+        else:
+            st.caption("計測結果はまだありません。")
+        if not COUNT_MESSAGES:
+            st.caption("送信メッセージ数・バイト数は EPL_PROFILE=1 で起動した場合のみ計測します。")
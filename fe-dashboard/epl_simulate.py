@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# 1タスクで計算するシーズン数 (配列は シーズン数 × 試合数)。分割はワーカー数によらず固定
+BATCH_SEASONS = 5_000
+# 1チーム1試合あたりの平均得点 / ホームの得点倍率
+LEAGUE_GOALS = 1.4
+HOME_ADVANTAGE = 1.2
+# 勝ち点が並んだ場合は得失点差、総得点の順で比べる (それも並べば無作為)
+_POINTS, _DIFF, _DIFF_OFFSET = 1e7, 1e3, 5_000
+
+
+def team_rates(team_df):
+    """チーム表の総得点・総失点から攻撃力・守備力 (リーグ平均 = 1) を求める
+
+    総得点・総失点のないチーム (シーズン表にのみ存在するチーム) は除く。
+    """
+    teams = team_df.dropna(subset=["総得点", "総失点"])
+    goals_for = teams["総得点"].to_numpy(dtype=float)
+    goals_against = teams["総失点"].to_numpy(dtype=float)
+    return pd.DataFrame({
+        "チーム": teams["チーム"].astype(str).to_numpy(),
+        "攻撃力": goals_for / goals_for.mean(),
+        "守備力": goals_against / goals_against.mean(),
+    })
+
+
+def fixtures(n):
+    # 全チームがホーム・アウェイで1回ずつ対戦する (n × (n - 1) 試合)
+    return np.nonzero(~np.eye(n, dtype=bool))
+
+
+def simulate_batch(attack, defence, seasons, seed, league_goals=LEAGUE_GOALS, home_advantage=HOME_ADVANTAGE):
+    """seasons シーズン分の全試合の得点をポアソン分布でまとめて引き、順位を集計する
+
+    (順位別の回数 [チーム × 順位], 勝ち点の合計, 勝ち点の二乗和) を返す。
+    """
+    rng = np.random.default_rng(seed)
+    n = len(attack)
+    home, away = fixtures(n)
+    home_goals = rng.poisson(league_goals * home_advantage * attack[home] * defence[away], (seasons, len(home)))
+    away_goals = rng.poisson(league_goals * attack[away] * defence[home], (seasons, len(home)))
+
+    # 試合 → チームの対応表 (ホーム +1 / アウェイ +1) を掛けてチームごとに合計する
+    home_side = np.zeros((len(home), n))
+    home_side[np.arange(len(home)), home] = 1
+    away_side = np.zeros((len(home), n))
+    away_side[np.arange(len(home)), away] = 1
+    diff = home_goals - away_goals
+    home_points = np.where(diff > 0, 3.0, np.where(diff == 0, 1.0, 0.0))
+    away_points = np.where(diff < 0, 3.0, np.where(diff == 0, 1.0, 0.0))
+    points = home_points @ home_side + away_points @ away_side
+    goal_diff = diff @ (home_side - away_side)
+    goals = home_goals @ home_side + away_goals @ away_side
+
+    key = points * _POINTS + (goal_diff + _DIFF_OFFSET) * _DIFF + goals + rng.random((seasons, n))
+    order = np.argsort(-key, axis=1)
+    positions = np.bincount((order * n + np.arange(n)).ravel(), minlength=n * n).reshape(n, n)
+    return positions, points.sum(axis=0), (points ** 2).sum(axis=0)
+
+
+def simulate(rates, seasons=100_000, seed=0, league_goals=LEAGUE_GOALS, home_advantage=HOME_ADVANTAGE,
+             executor=None, batch=BATCH_SEASONS):
+    """rates (team_rates の結果) の全チームでリーグ戦を seasons 回行い、チームごとの確率を返す
+
+    executor (ProcessPoolExecutor など) を渡すとバッチをワーカーに分配する。
+    各バッチの乱数は SeedSequence(seed) から作るため、結果はワーカー数によらず同じ。
+    """
+    attack = rates["攻撃力"].to_numpy(dtype=float)
+    defence = rates["守備力"].to_numpy(dtype=float)
+    n = len(attack)
+    sizes = [batch] * (seasons // batch) + ([seasons % batch] if seasons % batch else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = ([attack] * len(sizes), [defence] * len(sizes), sizes, seeds,
+            [league_goals] * len(sizes), [home_advantage] * len(sizes))
+    results = (executor.map if executor is not None else map)(simulate_batch, *args)
+
+    positions, points, squares = np.zeros((n, n), dtype=np.int64), np.zeros(n), np.zeros(n)
+    for batch_positions, batch_points, batch_squares in results:
+        positions += batch_positions
+        points += batch_points
+        squares += batch_squares
+    mean = points / seasons
+    summary = pd.DataFrame({
+        "チーム": rates["チーム"].to_numpy(),
+        "優勝確率": positions[:, 0] / seasons,
+        "上位4位確率": positions[:, :4].sum(axis=1) / seasons,
+        "平均順位": (positions * np.arange(1, n + 1)).sum(axis=1) / seasons,
+        "平均勝ち点": mean,
+        "勝ち点標準偏差": np.sqrt(np.maximum(squares / seasons - mean ** 2, 0)),
+    })
+    return summary.sort_values(["優勝確率", "平均勝ち点"], ascending=False, ignore_index=True)
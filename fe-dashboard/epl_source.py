@@ -0,0 +1,127 @@
+import os
+
+import pandas as pd
+
+import epl_data
+
+# データソースの切り替え (環境変数)
+#   EPL_DATA_SOURCE=builtin (既定) | parquet | snowflake
+#   EPL_PARQUET_DIR=<seasons.parquet / teams.parquet のあるディレクトリ>
+SOURCE_ENV = "EPL_DATA_SOURCE"
+PARQUET_DIR_ENV = "EPL_PARQUET_DIR"
+DEFAULT_PARQUET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "epl")
+
+# チーム表のうちシーズン表から導出する列
+DERIVED_TEAM_COLUMNS = ["優勝回数"]
+
+
+def derive_team_table(seasons, teams):
+    """優勝回数をシーズン表から数え直してチーム表に反映する
+
+    シーズン表にのみ存在するチームは行を追加し、それ以外の列は欠損とする。
+    """
+    titles = seasons.groupby("優勝チーム", observed=True).size()
+    teams = teams.drop(columns=DERIVED_TEAM_COLUMNS, errors="ignore").set_index("チーム")
+    teams = teams.reindex(teams.index.union(titles.index, sort=False))
+    teams.insert(0, "優勝回数", titles.reindex(teams.index, fill_value=0).astype("int64"))
+    teams.index.name = "チーム"
+    return teams.reset_index().sort_values("優勝回数", ascending=False, kind="stable", ignore_index=True)
+
+
+class BuiltinSource:
+    """epl_data に埋め込まれた元データ"""
+
+    name = "builtin"
+
+    def version(self):
+        return "builtin"
+
+    def seasons(self):
+        return pd.DataFrame(epl_data.SEASON_DATA)
+
+    def teams(self):
+        return pd.DataFrame(epl_data.TEAM_STATS)
+
+
+class ParquetSource:
+    """ローカルの Parquet ファイル (メモリマップで読み込み)"""
+
+    name = "parquet"
+    FILES = {"seasons": "seasons.parquet", "teams": "teams.parquet"}
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, table):
+        return os.path.join(self.directory, self.FILES[table])
+
+    def version(self):
+        # ファイルの更新時刻とサイズ (変更されたら別バージョン)
+        stamps = []
+        for table in self.FILES:
+            try:
+                info = os.stat(self._path(table))
+            except FileNotFoundError:
+                continue
+            stamps.append(f"{table}:{info.st_mtime_ns}:{info.st_size}")
+        return "|".join(stamps)
+
+    def _read(self, table):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(self._path(table), memory_map=True).to_pandas()
+
+    def seasons(self):
+        return self._read("seasons")
+
+    def teams(self):
+        return self._read("teams")
+
+
+class SnowflakeSource:
+    """dashboard.py と同じ接続プールから読み込む
+
+    version() は各テーブルの LAST_ALTERED を ETag として使う。
+    """
+
+    name = "snowflake"
+    TABLES = {"seasons": "EPL_SEASONS", "teams": "EPL_TEAMS"}
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _fetch(self, query, params=None):
+        from fetch import fetch_frame
+
+        return self.pool.run(lambda conn: fetch_frame(conn, query, params))
+
+    def version(self):
+        etag = self._fetch(
+            "SELECT TABLE_NAME, LAST_ALTERED FROM INFORMATION_SCHEMA.TABLES"
+            " WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME IN (%(seasons)s, %(teams)s)"
+            " ORDER BY TABLE_NAME",
+            self.TABLES,
+        )
+        return "|".join(f"{name}:{altered}" for name, altered in etag.itertuples(index=False))
+
+    def _read(self, table):
+        return self._fetch(f"SELECT * FROM {self.TABLES[table]}")
+
+    def seasons(self):
+        return self._read("seasons")
+
+    def teams(self):
+        return self._read("teams")
+
+
+def source_from_env():
+    kind = os.environ.get(SOURCE_ENV, "builtin")
+    if kind == "parquet":
+        return ParquetSource(os.environ.get(PARQUET_DIR_ENV, DEFAULT_PARQUET_DIR))
+    if kind == "snowflake":
+        from snowflake_pool import get_pool
+
+        return SnowflakeSource(get_pool())
+    if kind == "builtin":
+        return BuiltinSource()
+    raise ValueError(f"不明なデータソースです: {kind!r}")
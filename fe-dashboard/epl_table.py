@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+PAGE_SIZES = [50, 100, 500]
+
+
+def _sort_values(column):
+    # 順序付きカテゴリ (シーズン) はカテゴリ順で並べる
+    if hasattr(column, "cat"):
+        return column.cat.codes.to_numpy()
+    return column.to_numpy()
+
+
+# フィルタ状態・列ごとの昇順の並び (行位置)。降順は逆順で使う
+@st.cache_resource(max_entries=256, show_spinner=False)
+def sort_order(key, _df, column):
+    order = np.argsort(_sort_values(_df[column]), kind="stable")
+    order.flags.writeable = False
+    return order
+
+
+# フィルタ状態ごとのグラデーション用の列の最小・最大値
+@st.cache_resource(max_entries=128, show_spinner=False)
+def column_bounds(key, _df, columns):
+    return {col: (_df[col].min(), _df[col].max()) for col in columns}
+
+
+def paged_table(df, key, sort_column, ascending, formats, gradient_columns, cmap="Greens", height=500):
+    """並べ替え済みの1ページ分だけを Styler で描画する
+
+    並びは列ごとの argsort をキャッシュして再利用し、グラデーションの範囲は
+    表示ページではなく全体の最小・最大値で固定する。
+    """
+    order = sort_order(key, df, sort_column)
+    if not ascending:
+        order = order[::-1]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("表示件数:", options=PAGE_SIZES, key="table_page_size")
+    pages = max(1, math.ceil(len(df) / page_size))
+    page = 1
+    with col2:
+        if pages > 1:
+            page = st.number_input(f"ページ (全{pages}ページ)", min_value=1, max_value=pages, value=1, key="table_page")
+
+    offset = (page - 1) * page_size
+    page_df = df.iloc[order[offset:offset + page_size]]
+
+    styler = page_df.style.format(formats)
+    bounds = column_bounds(key, df, tuple(gradient_columns)) if len(df) else {}
+    for col, (vmin, vmax) in bounds.items():
+        styler = styler.background_gradient(subset=[col], cmap=cmap, vmin=vmin, vmax=vmax)
+    st.dataframe(styler, use_container_width=True, height=height)
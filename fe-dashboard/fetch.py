@@ -0,0 +1,98 @@
+import pandas as pd
+import pyarrow as pa
+from snowflake.connector.errors import NotSupportedError
+
+import query_trace
+
+
+def _empty_frame(cur):
+    return pd.DataFrame(columns=[col[0] for col in cur.description or []])
+
+
+def _fetch_rows(cur):
+    # Arrow形式で返らない結果 (JSON結果など) 向けの行単位フォールバック
+    return pd.DataFrame.from_records(cur.fetchall(), columns=[col[0] for col in cur.description])
+
+
+def fetch_arrow(cur):
+    with query_trace.span("fetch"):
+        batches = list(cur.fetch_arrow_batches())
+    with query_trace.span("build"):
+        if not batches:
+            return pa.Table.from_pandas(_empty_frame(cur), preserve_index=False)
+        return pa.concat_tables(batches)
+
+
+def fetch_pandas(cur):
+    with query_trace.span("fetch"):
+        frames = [frame for frame in cur.fetch_pandas_batches() if len(frame)]
+    with query_trace.span("build"):
+        if not frames:
+            return _empty_frame(cur)
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+
+def _execute(conn, cur, query, params):
+    cur.execute(query, params)
+
+
+def iter_batches(conn, query, params=None, fallback_rows=65_536, execute=None):
+    """クエリを実行し、結果を pyarrow.RecordBatch 単位で順に返す (全件をまとめて保持しない)
+
+    結果が0行の場合も列名を持つ空のバッチを1つ返す。
+    execute(conn, cursor, query, params) を渡すとその関数でクエリを実行する (非同期投入など)。
+    """
+    cur = conn.cursor()
+    try:
+        with query_trace.span("execute"):
+            (execute or _execute)(conn, cur, query, params)
+        query_trace.annotate(query_id=getattr(cur, "sfqid", None))
+        empty = True
+        try:
+            for table in cur.fetch_arrow_batches():
+                for batch in table.to_batches():
+                    empty = False
+                    yield batch
+        except NotSupportedError:
+            columns = [col[0] for col in cur.description]
+            while True:
+                rows = cur.fetchmany(fallback_rows)
+                if not rows:
+                    break
+                empty = False
+                yield pa.RecordBatch.from_pandas(pd.DataFrame.from_records(rows, columns=columns), preserve_index=False)
+        if empty:
+            yield pa.RecordBatch.from_pandas(_empty_frame(cur), preserve_index=False)
+    finally:
+        cur.close()
+
+
+def _result_bytes(result):
+    if isinstance(result, pa.Table):
+        return result.nbytes
+    return int(result.memory_usage(index=False).sum())
+
+
+def fetch_frame(conn, query, params=None, as_arrow=False, execute=None):
+    """クエリを実行し、Arrowバッチ単位で列指向のまま結果を組み立てる
+
+    as_arrow=True の場合は pyarrow.Table のまま返す。execute は iter_batches と同じ。
+    """
+    cur = conn.cursor()
+    try:
+        with query_trace.span("execute"):
+            (execute or _execute)(conn, cur, query, params)
+        query_trace.annotate(query_id=getattr(cur, "sfqid", None))
+        try:
+            result = fetch_arrow(cur) if as_arrow else fetch_pandas(cur)
+        except NotSupportedError:
+            with query_trace.span("fetch"):
+                df = _fetch_rows(cur)
+            with query_trace.span("build"):
+                result = pa.Table.from_pandas(df, preserve_index=False) if as_arrow else df
+        query_trace.annotate(rows=len(result), bytes=_result_bytes(result))
+        return result
+    finally:
+        cur.close()
@@ -0,0 +1,291 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import queries
+
+DAY = 86400
+
+# 問題番号から分野を引く (基本情報 午前の出題順)。{分野: (最初の問題番号, 最後の問題番号)}
+TOPICS = {
+    "テクノロジ系": (1, 50),
+    "マネジメント系": (51, 60),
+    "ストラテジ系": (61, 80),
+}
+
+_SUMS = ["CORRECT", "ANSWERS", "W_CORRECT", "W_ANSWERS"]
+
+
+def _percent(correct, answers):
+    return (correct / answers * 100).round(1)
+
+
+def _seconds(column):
+    # ANSWERED_AT (文字列または TIMESTAMP) を UNIX 秒に変換
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        column = pc.strptime(column, format="%Y-%m-%d %H:%M:%S", unit="s")
+    elif pa.types.is_date(column.type):
+        column = column.cast(pa.timestamp("s"))
+    return column.cast(pa.timestamp("s")).cast(pa.int64()).to_numpy(zero_copy_only=False)
+
+
+class LearningAnalytics:
+    """問題別学習履歴 (QUESTION_DETAIL_WITH_ATTEMPT) の全行から各ページの集計を導出する
+
+    集計は加算できる統計量 (正解数・回答数・時間減衰つきの正解数など) を
+    (試験回, 問題, 回目) と (試験回, 日) ごとに保持し、追記された行だけを加算して更新する。
+    ビューはこの小さな集計から毎回作る。
+    回答時刻 (高水位線の列) が NULL の行と試験回が NULL の行は集計に含めず、
+    それぞれ null_rows / null_term_rows に件数だけ数える。
+
+    - half_life_days: 習熟度の計算で過去の回答の重みが半分になる日数
+    - stability_days: 1回も正解していない問題の記憶の保持日数 (正解するごとに延びる)
+    """
+
+    def __init__(self, watermark=queries.QUESTION_DETAIL_WATERMARK, half_life_days=30.0, stability_days=7.0,
+                 topics=None):
+        self.watermark = watermark
+        self.half_life = half_life_days * DAY
+        self.stability = stability_days * DAY
+        self.topics = dict(topics or TOPICS)
+        self._lock = threading.Lock()
+        self._reset()
+        self.stats = {"rebuilds": 0, "appends": 0, "appended_rows": 0}
+
+    def _reset(self):
+        self._table = None
+        self._mark = None
+        self._origin = None
+        self.rows = 0
+        self.null_rows = 0
+        self.null_term_rows = 0
+        self._terms = []
+        self._term_codes = {}
+        self._questions = None
+        self._days = None
+        self._cached = None
+
+    def _codes(self, column):
+        # 試験回の文字列を通し番号に変換 (新しい試験回は末尾に追加)
+        encoded = pc.dictionary_encode(column.combine_chunks())
+        lookup = np.empty(len(encoded.dictionary), dtype=np.int64)
+        for i, term in enumerate(encoded.dictionary.to_pylist()):
+            if term not in self._term_codes:
+                self._term_codes[term] = len(self._terms)
+                self._terms.append(term)
+            lookup[i] = self._term_codes[term]
+        return lookup[encoded.indices.to_numpy(zero_copy_only=False)]
+
+    def _aggregate(self, table):
+        seconds = _seconds(table.column(self.watermark))
+        if self._origin is None:
+            self._origin = int(seconds.min()) if len(seconds) else 0
+        correct = pc.fill_null(table.column("IS_CORRECT"), 0).cast(pa.float64()).to_numpy()
+        # 時間減衰の重みは基準時刻からの経過で表し、後から全体に掛ける (加算で更新できる)
+        weight = np.exp2((seconds - self._origin) / self.half_life)
+        frame = pd.DataFrame({
+            "TERM": self._codes(table.column("EXAM_TERM")),
+            "QUESTION_NO": table.column("QUESTION_NO").to_numpy(),
+            "ATTEMPT_NO": table.column("ATTEMPT_NO").to_numpy(),
+            "DAY": seconds // DAY,
+            "CORRECT": correct,
+            "ANSWERS": 1.0,
+            "W_CORRECT": correct * weight,
+            "W_ANSWERS": weight,
+            "LAST": seconds,
+        })
+        questions = frame.groupby(["TERM", "QUESTION_NO", "ATTEMPT_NO"], sort=False).agg(
+            {"CORRECT": "sum", "ANSWERS": "sum", "W_CORRECT": "sum", "W_ANSWERS": "sum", "LAST": "max"}
+        )
+        days = frame.groupby(["TERM", "DAY"], sort=False)[["CORRECT", "ANSWERS"]].sum()
+        return questions, days
+
+    @staticmethod
+    def _merge(current, delta, how):
+        if current is None:
+            return delta
+        return pd.concat([current, delta]).groupby(level=list(range(current.index.nlevels)), sort=False).agg(how)
+
+    def _append(self, table):
+        # 呼び出し側で回答時刻・試験回が NULL の行を除いておくこと
+        questions, days = self._aggregate(table)
+        how = {name: "sum" for name in _SUMS}
+        self._questions = self._merge(self._questions, questions, {**how, "LAST": "max"})
+        self._days = self._merge(self._days, days, "sum")
+        self._cached = None
+        self.rows += table.num_rows
+
+    def sync(self, table):
+        """最新の全件テーブルに追いつく。追記分だけ加算し、それ以外の変更があれば作り直す
+
+        更新した場合は True を返す。
+        """
+        with self._lock:
+            if table is self._table:
+                return False
+            column, terms = table.column(self.watermark), table.column("EXAM_TERM")
+            valid = pc.and_(pc.is_valid(column), pc.is_valid(terms))
+            skipped = table.num_rows - pc.sum(valid).as_py() if table.num_rows else 0
+            delta = None
+            if self._mark is not None:
+                # NULL の行は条件も NULL になり、delta には入らない
+                delta = table.filter(pc.and_(pc.greater(column, self._mark), valid))
+                # 高水位線以前の行が増減していれば追記ではない
+                if table.num_rows - skipped - delta.num_rows != self.rows:
+                    delta = None
+            if delta is None:
+                self._reset()
+                self.stats["rebuilds"] += 1
+                delta = table.filter(valid) if skipped else table
+            else:
+                self.stats["appends"] += 1
+                self.stats["appended_rows"] += delta.num_rows
+            self.null_rows, self.null_term_rows = column.null_count, terms.null_count
+            if delta.num_rows:
+                self._append(delta)
+                self._mark = pc.max(column)
+            self._table = table
+            return True
+
+    def _frames(self):
+        # ビューの元になる集計 (試験回は文字列に戻す) と減衰の基準時刻。更新されるまで使い回す
+        # 呼び出し側は返した DataFrame を書き換えないこと
+        with self._lock:
+            if self._cached is None:
+                self._cached = self._build_frames()
+            return self._cached
+
+    def _build_frames(self):
+        if self._questions is None:
+            questions = pd.DataFrame(0, index=[], columns=["QUESTION_NO", "ATTEMPT_NO", "LAST"] + _SUMS)
+            days = pd.DataFrame(0, index=[], columns=["DAY", "CORRECT", "ANSWERS"])
+            questions["EXAM_TERM"] = days["EXAM_TERM"] = pd.Series([], dtype=object)
+            return questions, days, 0
+        terms = np.array(self._terms, dtype=object)
+        questions, days = self._questions.reset_index(), self._days.reset_index()
+        questions["EXAM_TERM"] = terms[questions.pop("TERM").to_numpy()]
+        days["EXAM_TERM"] = terms[days.pop("TERM").to_numpy()]
+        return questions, days, self._origin
+
+    def exam_terms(self):
+        with self._lock:
+            return sorted(self._terms)
+
+    # 既存の Snowflake ビューに相当する集計 (作る列は queries.py で宣言)
+    def exam_term_stats(self, exam_term):
+        questions, _, _ = self._frames()
+        stats = (
+            questions[questions["EXAM_TERM"] == exam_term]
+            .groupby("ATTEMPT_NO", as_index=False)[["CORRECT", "ANSWERS"]].sum()
+        )
+        stats["EXAM_TERM"] = exam_term
+        stats["ACCURACY"] = _percent(stats["CORRECT"], stats["ANSWERS"])
+        stats["AVERAGE_ACCURACY"] = round(stats["ACCURACY"].mean(), 1)
+        return stats[queries.EXAM_TERM_STATS_LOCAL_COLUMNS]
+
+    def monthly_overview(self):
+        _, days, _ = self._frames()
+        # 日付の文字列化は日ごとにまとめてから行う
+        daily = days.groupby("DAY")[["CORRECT", "ANSWERS"]].sum()
+        months = pd.to_datetime(daily.index.to_numpy(dtype=np.int64) * DAY, unit="s").strftime("%Y-%m")
+        monthly = daily.groupby(months)[["CORRECT", "ANSWERS"]].sum().rename_axis("STUDY_MONTH").reset_index()
+        monthly["ACCURACY"] = _percent(monthly["CORRECT"], monthly["ANSWERS"])
+        monthly["TOTAL"] = monthly["ANSWERS"].astype(np.int64)
+        return monthly[queries.MONTHLY_OVERVIEW_COLUMNS]
+
+    def exam_term_summary(self):
+        questions, _, _ = self._frames()
+        summary = questions.groupby("EXAM_TERM", as_index=False).agg(
+            ATTEMPTS=("ATTEMPT_NO", "max"),
+            QUESTIONS=("QUESTION_NO", "nunique"),
+            ANSWERS=("ANSWERS", "sum"),
+            CORRECT=("CORRECT", "sum"),
+        )
+        summary["ANSWERS"] = summary["ANSWERS"].astype(np.int64)
+        summary["ACCURACY"] = _percent(summary.pop("CORRECT"), summary["ANSWERS"])
+        return summary[queries.EXAM_TERM_ATTEMPT_SUMMARY_LOCAL_COLUMNS]
+
+    # 追加の集計
+    def rolling_accuracy(self, window_days=7, exam_term=None):
+        """日ごとの正解率と、直近 window_days 日の回答をまとめた移動正解率 (回答のない日も含む)"""
+        _, days, _ = self._frames()
+        if exam_term is not None:
+            days = days[days["EXAM_TERM"] == exam_term]
+        daily = days.groupby("DAY")[["CORRECT", "ANSWERS"]].sum()
+        if not daily.empty:
+            daily = daily.reindex(np.arange(daily.index.min(), daily.index.max() + 1), fill_value=0)
+        rolling = daily.rolling(window_days, min_periods=1).sum()
+        return pd.DataFrame({
+            "STUDY_DATE": pd.to_datetime(daily.index.to_numpy(dtype=np.int64) * DAY, unit="s"),
+            "ANSWERS": daily["ANSWERS"].to_numpy(dtype=np.int64),
+            "ACCURACY": _percent(daily["CORRECT"], daily["ANSWERS"].where(daily["ANSWERS"] > 0)).to_numpy(),
+            "ROLLING_ACCURACY": _percent(rolling["CORRECT"], rolling["ANSWERS"].where(rolling["ANSWERS"] > 0)).to_numpy(),
+        })
+
+    def mastery(self, exam_term=None, now=None):
+        """問題ごとの習熟度と忘却度 (%)
+
+        MASTERY: 新しい回答ほど重く数えた正解率 (回答が少ない問題は全体の正解率に寄せる)
+        FORGETTING: 最後の回答からの経過日数による忘却の見込み (正解した回数が多いほど緩やか)
+        now (UNIX 秒) を省略した場合はデータ中の最新の回答時刻を基準にする。
+        """
+        questions, _, origin = self._frames()
+        if exam_term is not None:
+            questions = questions[questions["EXAM_TERM"] == exam_term]
+        scores = questions.groupby(["EXAM_TERM", "QUESTION_NO"], as_index=False).agg(
+            {"CORRECT": "sum", "ANSWERS": "sum", "W_CORRECT": "sum", "W_ANSWERS": "sum", "LAST": "max"}
+        )
+        correct, answers = scores["CORRECT"].to_numpy(float), scores["ANSWERS"].to_numpy(float)
+        last = scores["LAST"].to_numpy(dtype=np.int64)
+        if now is None:
+            now = last.max() if len(last) else 0
+        prior = correct.sum() / answers.sum() if answers.sum() else 0.0
+        # 重みの基準時刻を now に合わせる (全体に同じ係数を掛けるだけ)
+        scale = np.exp2((origin - now) / self.half_life)
+        mastery = (scores["W_CORRECT"].to_numpy(float) * scale + 2 * prior) / (scores["W_ANSWERS"].to_numpy(float) * scale + 2)
+        elapsed = np.maximum(now - last, 0)
+        forgetting = 1 - np.exp(-elapsed / (self.stability * (1 + correct)))
+        return pd.DataFrame({
+            "EXAM_TERM": scores["EXAM_TERM"],
+            "QUESTION_NO": scores["QUESTION_NO"],
+            "ANSWERS": answers.astype(np.int64),
+            "ACCURACY": _percent(correct, answers),
+            "MASTERY": (mastery * 100).round(1),
+            "DAYS_SINCE": (elapsed / DAY).round(1),
+            "FORGETTING": (forgetting * 100).round(1),
+        })
+
+    def weak_topics(self, exam_term=None, now=None):
+        """分野ごとの弱点ランキング (今も正解できる見込み = 習熟度 × (1 - 忘却度) の低い順)"""
+        scores = self.mastery(exam_term, now)
+        bounds = sorted((lo, hi, name) for name, (lo, hi) in self.topics.items())
+        numbers = scores["QUESTION_NO"].to_numpy()
+        position = np.searchsorted([lo for lo, _, _ in bounds], numbers, side="right") - 1
+        ends = np.array([hi for _, hi, _ in bounds])
+        inside = (position >= 0) & (numbers <= ends[np.maximum(position, 0)])
+        names = np.array([name for _, _, name in bounds] + ["その他"], dtype=object)
+        scores["TOPIC"] = names[np.where(inside, position, len(bounds))]
+        scores["RECALL"] = scores["MASTERY"] * (1 - scores["FORGETTING"] / 100)
+        ranking = scores.groupby("TOPIC").agg(
+            QUESTIONS=("QUESTION_NO", "size"),
+            ANSWERS=("ANSWERS", "sum"),
+            MASTERY=("MASTERY", "mean"),
+            FORGETTING=("FORGETTING", "mean"),
+            RECALL=("RECALL", "mean"),
+        ).round(1).sort_values("RECALL").reset_index()
+        ranking.insert(0, "RANK", np.arange(1, len(ranking) + 1))
+        return ranking
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "rows": self.rows,
+                "null_rows": self.null_rows,
+                "null_term_rows": self.null_term_rows,
+                "groups": 0 if self._questions is None else len(self._questions),
+            }
@@ -0,0 +1,104 @@
+import re
+from collections import namedtuple
+
+# SQL本文とバインドパラメータの組 (run_query(*query) で実行)
+Query = namedtuple("Query", ["sql", "params"])
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_FROM = re.compile(r"\bFROM\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+# ページごとに必要な列 (None は全列)
+# ページ1は取得した表をそのまま表示するため、ビューの全列を取得する
+EXAM_TERM_STATS_COLUMNS = None
+# ローカル集計で作る EXAM_TERM_ATTEMPT_STATS の列 (ページ1のグラフ・指標に使う列)
+EXAM_TERM_STATS_LOCAL_COLUMNS = ["EXAM_TERM", "ATTEMPT_NO", "ACCURACY", "AVERAGE_ACCURACY"]
+MONTHLY_OVERVIEW_COLUMNS = ["STUDY_MONTH", "ACCURACY", "TOTAL"]
+# ローカル集計で作る EXAM_TERM_ATTEMPT_SUMMARY の列 (ページ4は集計ビューの全列を表示する)
+EXAM_TERM_ATTEMPT_SUMMARY_LOCAL_COLUMNS = ["EXAM_TERM", "ATTEMPTS", "QUESTIONS", "ANSWERS", "ACCURACY"]
+QUESTION_DETAIL_COLUMNS = None
+
+# 差分取得の高水位線に使う列 (追記のみで単調増加する列)
+QUESTION_DETAIL_WATERMARK = "ANSWERED_AT"
+
+
+def _ident(name):
+    # 識別子はバインドできないため、英数字とアンダースコア以外を拒否する
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"不正な識別子です: {name!r}")
+    return name
+
+
+def view_of(sql):
+    # SQLが参照するビュー名 (ビューごとの設定の引き当て用)。見つからなければ None
+    match = _FROM.search(sql)
+    return match.group(1).upper() if match else None
+
+
+def distinct_values(view, column):
+    # セレクトボックスの選択肢用 (NULL除外・昇順)
+    col = _ident(column)
+    return Query(
+        f"SELECT DISTINCT {col} FROM {_ident(view)} WHERE {col} IS NOT NULL ORDER BY {col}",
+        None,
+    )
+
+
+def _conditions(where=None, after=None, upto=None, upto_null=False):
+    # where: {列名: 値} の等価条件 / after: {列名: 値} の > 条件 / upto: {列名: 値} の <= 条件
+    # upto_null=True なら upto の列が NULL の行も条件に含める
+    clauses, params = [], {}
+    for op, suffix, conds in (("=", "", where), (">", "__after", after), ("<=", "__upto", upto)):
+        for col, value in (conds or {}).items():
+            name = _ident(col) + suffix
+            clause = f"{col} {op} %({name})s"
+            if suffix == "__upto" and upto_null:
+                clause = f"({clause} OR {col} IS NULL)"
+            clauses.append(clause)
+            params[name] = value
+    if not clauses:
+        return "", None
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def select(view, columns=None, where=None, order_by=None, after=None):
+    # 値はすべて %(名前)s でバインドする
+    projection = ", ".join(_ident(col) for col in columns) if columns else "*"
+    clause, params = _conditions(where, after)
+    sql = f"SELECT {projection} FROM {_ident(view)}" + clause
+    if order_by:
+        sql += " ORDER BY " + ", ".join(_ident(col) for col in order_by)
+    return Query(sql, params)
+
+
+def count_rows(view, where=None, upto=None, upto_null=False):
+    clause, params = _conditions(where, upto=upto, upto_null=upto_null)
+    return Query(f"SELECT COUNT(*) AS ROW_COUNT FROM {_ident(view)}" + clause, params)
+
+
+# 各ページで使うクエリ (ページ表示と事前取得で共通)
+def exam_term_options(view):
+    return distinct_values(view, "EXAM_TERM")
+
+
+def exam_term_stats(exam_term):
+    return select(
+        "EXAM_TERM_ATTEMPT_STATS",
+        EXAM_TERM_STATS_COLUMNS,
+        where={"EXAM_TERM": exam_term},
+        order_by=["ATTEMPT_NO"],
+    )
+
+
+def monthly_overview():
+    # グラフで全月を使うため、必要な列だけを全件取得
+    return select("MONTHLY_OVERVIEW", MONTHLY_OVERVIEW_COLUMNS, order_by=["STUDY_MONTH"])
+
+
+def question_detail(exam_term=None):
+    # exam_term を省略すると全試験回 (ローカル集計用)
+    where = None if exam_term is None else {"EXAM_TERM": exam_term}
+    return select("QUESTION_DETAIL_WITH_ATTEMPT", QUESTION_DETAIL_COLUMNS, where=where)
+
+
+def exam_term_summary():
+    return select("EXAM_TERM_ATTEMPT_SUMMARY")
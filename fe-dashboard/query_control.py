@@ -0,0 +1,160 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import streamlit as st
+
+import queries
+
+logger = logging.getLogger(__name__)
+
+# 実行中の取得の (キー, 中止イベント)。loading() の中で実行したクエリがこれを参照する
+_loading = contextvars.ContextVar("query_control", default=None)
+
+
+class QueryCancelled(Exception):
+    """結果を待っていたセッションがいなくなったため中止したクエリ"""
+
+
+class QueryTimeout(Exception):
+    """ビューごとのステートメントタイムアウトを超えたため中止したクエリ"""
+
+
+class QueryControl:
+    """実行中のクエリ (Snowflake のクエリID) と、結果を待っているセッションの登録簿
+
+    - execute() はクエリを execute_async で投入し、完了まで状態を確認する。確認の間隔は
+      first_poll 秒から倍々に延ばし、poll_interval 秒で頭打ちにする (短いクエリを待たせない)
+    - 結果を待つセッションが全員離れた (ページ切替・再実行・停止) 取得は abort_query で中止する
+    - timeouts: {ビュー名: 秒} のステートメントタイムアウト (ないビューは default_timeout)
+
+    待っているセッションが一度もいない取得 (事前取得・裏での再取得) は中止しない。
+    タイムアウトは session_parameters() を接続時に渡すと倉庫側でも打ち切られる。
+    """
+
+    def __init__(self, default_timeout=None, timeouts=None, poll_interval=1.0, first_poll=0.02):
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self.poll_interval = poll_interval
+        self.first_poll = min(first_poll, poll_interval)
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(int)
+        self._cancel = {}
+        self._running = {}
+        self.stats = {"submitted": 0, "completed": 0, "cancelled": 0, "timeouts": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def timeout_for(self, query):
+        return self.timeouts.get(queries.view_of(query), self.default_timeout)
+
+    def session_parameters(self):
+        # 倉庫側のステートメントタイムアウト (セッション単位のため、ビューごとの値のうち最長のもの)
+        # ビューごとの値はクライアント側の execute() で打ち切る
+        # default_timeout がない (無制限のビューがある) 場合は設定しない
+        if not self.default_timeout:
+            return {}
+        return {"STATEMENT_TIMEOUT_IN_SECONDS": math.ceil(max([self.default_timeout, *self.timeouts.values()]))}
+
+    @contextmanager
+    def waiting(self, key):
+        # セッションが key の結果を待つ間だけ登録する。最後の1人が離れたら取得中のクエリを中止
+        with self._lock:
+            self._waiters[key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    del self._waiters[key]
+                    event = self._cancel.get(key)
+                    if event is not None:
+                        event.set()
+
+    @contextmanager
+    def loading(self, key):
+        # key の取得を開始する。この中で execute() したクエリは waiting() 側から中止できる
+        event = threading.Event()
+        with self._lock:
+            self._cancel[key] = event
+        token = _loading.set((key, event))
+        try:
+            yield
+        finally:
+            _loading.reset(token)
+            with self._lock:
+                if self._cancel.get(key) is event:
+                    del self._cancel[key]
+
+    def _abort(self, cursor, qid):
+        try:
+            cursor.abort_query(qid)
+        except Exception as e:
+            # 中止に失敗しても倉庫側のタイムアウトで止まるため、記録だけして続ける
+            logger.warning("abort_query failed for %s: %s", qid, e)
+
+    def execute(self, conn, cursor, query, params=None):
+        """cursor.execute の代わりに使う。完了後は cursor から通常どおり結果を読める"""
+        key, cancel = _loading.get() or (None, None)
+        timeout = self.timeout_for(query)
+        cursor.execute_async(query, params)
+        qid = cursor.sfqid
+        started = time.monotonic()
+        with self._lock:
+            self._running[qid] = (key, queries.view_of(query), started)
+            self.stats["submitted"] += 1
+        delay = self.first_poll
+        try:
+            while conn.is_still_running(conn.get_query_status_throw_if_error(qid)):
+                if cancel is not None and cancel.is_set():
+                    self._abort(cursor, qid)
+                    self._count("cancelled")
+                    logger.info("cancelled query %s: no session waiting for %s", qid, key)
+                    raise QueryCancelled(f"クエリ {qid} を中止しました。")
+                if timeout is not None and time.monotonic() - started > timeout:
+                    self._abort(cursor, qid)
+                    self._count("timeouts")
+                    logger.warning("cancelled query %s after %ss", qid, timeout)
+                    raise QueryTimeout(f"クエリが{timeout}秒以内に完了しませんでした。")
+                if timeout is not None:
+                    delay = min(delay, max(started + timeout - time.monotonic(), 0) + self.first_poll)
+                if cancel is not None:
+                    cancel.wait(delay)
+                else:
+                    time.sleep(delay)
+                delay = min(delay * 2, self.poll_interval)
+            cursor.get_results_from_sfqid(qid)
+            self._count("completed")
+        finally:
+            with self._lock:
+                self._running.pop(qid, None)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            snap = dict(self.stats)
+            snap["waiting"] = sum(self._waiters.values())
+            snap["running"] = [
+                {"query_id": qid, "view": view, "seconds": round(now - started, 1)}
+                for qid, (_, view, started) in self._running.items()
+            ]
+        return snap
+
+
+@st.cache_resource
+def get_query_control():
+    conf = st.secrets.get("query_control", {})
+    default = conf.get("statement_timeout", 300)
+    return QueryControl(
+        default_timeout=float(default) if default else None,
+        timeouts={view.upper(): float(sec) for view, sec in conf.get("timeouts", {}).items()},
+        poll_interval=float(conf.get("poll_interval", 1.0)),
+        first_poll=float(conf.get("first_poll", 0.02)),
+    )
@@ -0,0 +1,220 @@
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+from result_cache import normalize_sql
+
+# 1クエリ1行の JSON ログ (logging の設定で出力先を変える)
+logger = logging.getLogger(__name__)
+
+# 合計時間のヒストグラムの境界 (秒)
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_PREVIEW = 200
+
+_current = contextvars.ContextVar("query_trace", default=None)
+
+
+class QueryTrace:
+    """1回のクエリの区間ごとの所要時間と属性
+
+    kind: "request" (run_query の呼び出し) / "load" (キャッシュ・倉庫からの取得)
+    spans: {区間名: ミリ秒} (connect / execute / fetch / build / wait など)
+    attrs: cache (memory / disk / shared / warehouse), query_id, rows, bytes, retries など
+    """
+
+    def __init__(self, kind, key, query):
+        self.kind = kind
+        self.key = key
+        self.query = normalize_sql(query)[:QUERY_PREVIEW]
+        self.started = time.time()
+        self.spans = defaultdict(float)
+        self.attrs = {}
+        self.error = None
+        self.total_ms = None
+
+    def record(self):
+        return {
+            "kind": self.kind,
+            "key": self.key[:12],
+            "query": self.query,
+            "started": round(self.started, 3),
+            "total_ms": self.total_ms,
+            "spans": {stage: round(ms, 2) for stage, ms in self.spans.items()},
+            **self.attrs,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(stage):
+    # 実行中のトレースがあれば区間の時間を加算する (なければ何もしない)
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans[stage] += (time.perf_counter() - started) * 1000
+
+
+def annotate(**attrs):
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def increment(name, n=1):
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs[name] = trace.attrs.get(name, 0) + n
+
+
+class QueryLog:
+    """直近のトレースと Prometheus 形式のメトリクスを保持する
+
+    textfile を指定すると、node_exporter の textfile collector 用に書き出す。
+    書き出しは記録のついでに textfile_interval 秒に1回まで (書き出しに失敗しても記録は続ける)。
+    """
+
+    def __init__(self, max_traces=500, textfile=None, textfile_interval=15.0):
+        self.textfile = textfile
+        self.textfile_interval = textfile_interval
+        self._written = None
+        self._lock = threading.Lock()
+        self._traces = deque(maxlen=max_traces)
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._buckets = defaultdict(int)
+
+    @contextmanager
+    def trace(self, kind, key, query):
+        trace = QueryTrace(kind, key, query)
+        token = _current.set(trace)
+        started = time.perf_counter()
+        try:
+            yield trace
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            trace.total_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.add(trace)
+
+    def add(self, trace):
+        record = trace.record()
+        labels = (trace.kind, trace.attrs.get("cache", "none"))
+        seconds = trace.total_ms / 1000
+        with self._lock:
+            self._traces.append(record)
+            self._counts[("queries", labels)] += 1
+            self._sums[("seconds", labels)] += seconds
+            for bound in BUCKETS:
+                if seconds <= bound:
+                    self._buckets[(labels, bound)] += 1
+            for stage, ms in trace.spans.items():
+                self._sums[("stage_seconds", (trace.kind, stage))] += ms / 1000
+                self._counts[("stage", (trace.kind, stage))] += 1
+            for name in ("rows", "bytes", "retries"):
+                self._sums[(name, labels)] += trace.attrs.get(name, 0)
+            if trace.error:
+                self._counts[("errors", labels)] += 1
+        if trace.error:
+            logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        if self.textfile and self._textfile_due():
+            try:
+                self.write_textfile(self.textfile)
+            except OSError as e:
+                logger.warning("failed to write metrics textfile %s: %s", self.textfile, e)
+
+    def _textfile_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._written is not None and now - self._written < self.textfile_interval:
+                return False
+            self._written = now
+            return True
+
+    def recent(self, kind=None):
+        with self._lock:
+            traces = list(self._traces)
+        return [t for t in traces if kind is None or t["kind"] == kind]
+
+    def slowest(self, n=20, kind=None):
+        return sorted(self.recent(kind), key=lambda t: t["total_ms"], reverse=True)[:n]
+
+    def prometheus_text(self):
+        with self._lock:
+            counts, sums, buckets = dict(self._counts), dict(self._sums), dict(self._buckets)
+        lines = [
+            "# HELP dashboard_query_seconds Query latency by kind and cache source.",
+            "# TYPE dashboard_query_seconds histogram",
+        ]
+        for (name, labels), count in sorted(counts.items()):
+            if name != "queries":
+                continue
+            kind, cache = labels
+            label = f'kind="{kind}",cache="{cache}"'
+            for bound in BUCKETS:
+                lines.append(f'dashboard_query_seconds_bucket{{{label},le="{bound}"}} {buckets.get((labels, bound), 0)}')
+            lines.append(f'dashboard_query_seconds_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"dashboard_query_seconds_sum{{{label}}} {sums[('seconds', labels)]:.6f}")
+            lines.append(f"dashboard_query_seconds_count{{{label}}} {count}")
+        lines += [
+            "# HELP dashboard_query_stage_seconds Time spent per query stage.",
+            "# TYPE dashboard_query_stage_seconds summary",
+        ]
+        for (name, labels), count in sorted(counts.items()):
+            if name != "stage":
+                continue
+            label = f'kind="{labels[0]}",stage="{labels[1]}"'
+            lines.append(f"dashboard_query_stage_seconds_sum{{{label}}} {sums[('stage_seconds', labels)]:.6f}")
+            lines.append(f"dashboard_query_stage_seconds_count{{{label}}} {count}")
+        for name, help_text in (("rows", "Rows returned."), ("bytes", "Result bytes (Arrow)."),
+                                ("retries", "Connection retries.")):
+            lines += [f"# HELP dashboard_query_{name}_total {help_text}", f"# TYPE dashboard_query_{name}_total counter"]
+            for (key, labels), value in sorted(sums.items()):
+                if key == name:
+                    lines.append(f'dashboard_query_{name}_total{{kind="{labels[0]}",cache="{labels[1]}"}} {value:g}')
+        lines += ["# HELP dashboard_query_errors_total Failed queries.", "# TYPE dashboard_query_errors_total counter"]
+        for (name, labels), count in sorted(counts.items()):
+            if name == "errors":
+                lines.append(f'dashboard_query_errors_total{{kind="{labels[0]}",cache="{labels[1]}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # 読み込み途中のファイルを見せないよう一時ファイル + os.replace
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+@st.cache_resource
+def get_query_log():
+    conf = st.secrets.get("observability", {})
+    return QueryLog(
+        max_traces=int(conf.get("max_traces", 500)),
+        textfile=conf.get("metrics_textfile"),
+        textfile_interval=float(conf.get("metrics_interval", 15)),
+    )
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import query_trace
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher:
+    """stale-while-revalidate 方式のメモリキャッシュ
+
+    - 初回 (キャッシュなし) のみ呼び出し側が結果を待つ
+    - ttl * refresh_ahead 秒を過ぎたら古い結果をすぐ返し、裏で再取得する
+    - 同じキーの取得は同時に1本だけ実行する (single-flight)
+    - 再取得に失敗した場合は前回の結果を使い続ける
+    - ただし max_stale 秒 (既定は ttl の2倍) を過ぎた結果は返さず、呼び出し側が
+      再取得を待つ (失敗した場合は例外がそのまま伝わる)
+
+    loader(*args, refresh=bool) は (結果, 取得時刻 time.time()) を返す。下位キャッシュから
+    読んだ結果は元の取得時刻を返すこと (経過時間を引き継ぎ、古い結果を新しく見せない)。
+    refresh=True のときは下位キャッシュを使わず取得すること。
+    get(..., wait=fn) は初回の待ち方を fn(future) に任せる (中断できる待ち方など)。
+    """
+
+    def __init__(self, loader, ttl=600, refresh_ahead=0.8, max_workers=4, max_entries=64, max_stale=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = 2 * ttl if max_stale is None else max_stale
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.stats = {"fresh": 0, "stale": 0, "expired": 0, "misses": 0, "refreshes": 0, "coalesced": 0, "errors": 0}
+
+    def _load(self, key, args, refresh):
+        try:
+            value, created = self._loader(*args, refresh=refresh)
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats["errors"] += 1
+            logger.exception("refresh failed for %s", key)
+            raise
+        with self._lock:
+            self._store(key, value, created)
+            self._inflight.pop(key, None)
+        return value
+
+    def _store(self, key, value, created):
+        # 呼び出し前に self._lock を取得していること
+        # 取得時刻 (time.time()) を経過時間として time.monotonic() 基準に直す
+        now = time.monotonic()
+        loaded_at = now if created is None else now - max(time.time() - created, 0)
+        self._entries[key] = (value, loaded_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _submit(self, key, args, refresh):
+        # 呼び出し前に self._lock を取得していること
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return future
+        future = self._executor.submit(self._load, key, args, refresh)
+        self._inflight[key] = future
+        return future
+
+    def get(self, key, *args, wait=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                query_trace.annotate(memory="miss")
+                future = self._submit(key, args, refresh=False)
+            else:
+                value, loaded_at = entry
+                age = time.monotonic() - loaded_at
+                self._entries.move_to_end(key)
+                if age < self.ttl * self.refresh_ahead:
+                    self.stats["fresh"] += 1
+                    query_trace.annotate(memory="fresh")
+                    return value
+                if key not in self._inflight:
+                    self.stats["refreshes"] += 1
+                future = self._submit(key, args, refresh=True)
+                if age < self.max_stale:
+                    self.stats["stale"] += 1
+                    query_trace.annotate(memory="stale")
+                    return value
+                # 古すぎる結果は返さず、初回と同じく再取得を待つ
+                self.stats["expired"] += 1
+                query_trace.annotate(memory="expired")
+        return future.result() if wait is None else wait(future)
+
+    def prime(self, key, *args):
+        # 結果を待たずに取得だけ開始する (取得済みなら完了済みの Future を返す)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self._submit(key, args, refresh=False)
+        done = Future()
+        done.set_result(entry[0])
+        return done
+
+    def peek(self, key):
+        # 保持している結果を返す (なければ None)。取得は開始しない
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, created=None):
+        # 呼び出し側で取得した結果を登録する (created: 取得時刻 time.time()。省略時は現在)
+        with self._lock:
+            self._store(key, value, created)
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self.stats)
+            snap["entries"] = len(self._entries)
+            snap["inflight"] = len(self._inflight)
+        return snap
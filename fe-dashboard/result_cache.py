@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results")
+SUFFIX = ".arrow"
+
+
+def normalize_sql(query):
+    # 空白・末尾セミコロンの違いで別キーにならないように正規化
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def cache_key(query, params=None):
+    payload = json.dumps([normalize_sql(query), params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """クエリ結果をArrow IPCファイルとしてローカルに保存するディスクキャッシュ
+
+    - ttl: ファイル更新時刻 (= 結果の取得時刻) からの有効秒数
+    - max_bytes: 合計サイズの上限。超えたら最終アクセスが古い順に削除 (LRU)
+    - 書き込みは一時ファイル + os.replace でアトミックに行う
+    - 読み込みはメモリマップ (コピーなし)
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, ttl=600, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key, with_created=False):
+        # with_created=True なら (結果, 取得時刻 time.time()) を返す
+        path = self._path(key)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        if time.time() - mtime > self.ttl:
+            self._count("expired")
+            self._count("misses")
+            return None
+        try:
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            # 壊れたファイルはミス扱いで削除
+            logger.warning("result cache: unreadable entry %s", key)
+            self._remove(path)
+            self._count("misses")
+            return None
+        # LRU用に最終アクセス時刻のみ更新 (TTL判定の mtime は維持)
+        try:
+            os.utime(path, (time.time(), mtime))
+        except FileNotFoundError:
+            # 読み込み後に他のプロセス・スレッドが追い出した (読んだ結果はそのまま使える)
+            pass
+        self._count("hits")
+        logger.debug("result cache hit %s", key)
+        return (table, mtime) if with_created else table
+
+    def put(self, key, table, created=None):
+        # created: 結果の取得時刻。他のキャッシュから移した結果は元の時刻のまま期限を数える
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            if created is not None:
+                os.utime(tmp, (time.time(), created))
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self._count("writes")
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((info.st_atime, info.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self._count("evictions")
+            logger.info("result cache evicted %s", os.path.basename(path))
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self.stats)
+        lookups = snap["hits"] + snap["misses"]
+        snap["hit_rate"] = round(snap["hits"] / lookups, 3) if lookups else None
+        return snap
+
+
+@st.cache_resource
+def get_result_cache():
+    conf = st.secrets.get("result_cache", {})
+    return ResultCache(
+        directory=conf.get("directory", DEFAULT_DIR),
+        ttl=float(conf.get("ttl", 600)),
+        max_bytes=int(conf.get("max_mb", 512)) * 1024 * 1024,
+    )
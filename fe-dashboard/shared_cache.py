@@ -0,0 +1,229 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+import pyarrow as pa
+import streamlit as st
+
+from result_cache import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    data BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def serialize(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize(data):
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+
+
+class SharedCache:
+    """複数プロセス (レプリカ) で共有する SQLite ファイル上の結果キャッシュ
+
+    - 結果は Arrow IPC ストリームの BLOB として保存し、正規化した SQL も併せて記録する
+    - 取得はキーごとのロック行で排他し、同じビューを倉庫に問い合わせるのは全レプリカで1本だけ
+    - ロックを取れなかったプロセスは保持者の書き込みを待って結果を共有する
+    - 保持者は取得中に lock_timeout / 3 秒ごとにロックの期限を延ばす。保持者が落ちて延長が
+      止まると lock_timeout 秒でロックが失効し、別のプロセスが引き継ぐ
+
+    共有ボリュームはファイルロックに対応している必要がある (WAL は NFS では使えないため
+    journal_mode で変更できる)。
+    """
+
+    def __init__(self, path, ttl=600, max_bytes=1024 * 1024 * 1024, lock_timeout=120.0,
+                 poll_interval=0.05, journal_mode="WAL"):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "waits": 0, "takeovers": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 の接続はスレッドをまたげないため、スレッドごとに1本持つ
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key, max_age=None, with_created=False):
+        # created から max_age 秒 (既定は ttl) 以内の結果のみ返す
+        # with_created=True なら (結果, created) を返す
+        max_age = self.ttl if max_age is None else max_age
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT data, created FROM results WHERE key = ? AND created > ?", (key, time.time() - max_age)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        table = deserialize(row[0])
+        return (table, row[1]) if with_created else table
+
+    def put(self, key, query, table):
+        data = serialize(table)
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO results (key, query, data, bytes, created, accessed)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, normalize_sql(query), data, len(data), now, now),
+        )
+        self.evict()
+        return now
+
+    def evict(self):
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, bytes FROM results ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            logger.info("shared cache evicted %s", key)
+
+    def _acquire(self, key, owner):
+        # 失効済みのロックは上書きする。1文で判定・取得するため複数プロセスでも原子的
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO locks (key, owner, expires) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires"
+            " WHERE locks.expires < ?",
+            (key, owner, now + self.lock_timeout, now),
+        )
+        return cursor.rowcount == 1
+
+    def _renew(self, key, owner):
+        cursor = self._connect().execute(
+            "UPDATE locks SET expires = ? WHERE key = ? AND owner = ?",
+            (time.time() + self.lock_timeout, key, owner),
+        )
+        return cursor.rowcount == 1
+
+    def _heartbeat(self, key, owner, stop):
+        # load() の実行中はロックの期限を延ばし続ける (長いクエリの途中で引き継がれないように)
+        while not stop.wait(self.lock_timeout / 3):
+            try:
+                if not self._renew(key, owner):
+                    logger.warning("shared cache lock for %s was taken over", key)
+                    return
+            except sqlite3.Error:
+                logger.exception("failed to renew shared cache lock for %s", key)
+
+    def _release(self, key, owner):
+        self._connect().execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def _locked(self, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM locks WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def get_or_load(self, key, query, load, max_age=None, with_created=False):
+        """共有キャッシュの結果を返し、なければロックを取ったプロセスだけが load() を実行する
+
+        with_created=True なら (結果, created) を返す。
+        """
+        found = self.get(key, max_age, with_created=with_created)
+        if found is not None:
+            self._count("hits")
+            return found
+        self._count("misses")
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        waited = False
+        while not self._acquire(key, owner):
+            if not waited:
+                waited = True
+                self._count("waits")
+            time.sleep(self.poll_interval)
+            found = self.get(key, max_age, with_created=with_created)
+            if found is not None:
+                return found
+            if not self._locked(key):
+                # 保持者が失敗・失効した (次の _acquire で引き継ぐ)
+                self._count("takeovers")
+        try:
+            # ロック待ちの間に他のプロセスが書き込んでいれば再取得しない
+            found = self.get(key, max_age, with_created=with_created)
+            if found is not None:
+                return found
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(key, owner, stop), name="shared-cache-lock", daemon=True
+            )
+            heartbeat.start()
+            try:
+                table = load()
+            except Exception:
+                self._count("errors")
+                raise
+            finally:
+                stop.set()
+                heartbeat.join()
+            created = self.put(key, query, table)
+            self._count("loads")
+            return (table, created) if with_created else table
+        finally:
+            self._release(key, owner)
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self.stats)
+        conn = self._connect()
+        snap["entries"], snap["bytes"] = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM results"
+        ).fetchone()
+        snap["locks"] = conn.execute("SELECT COUNT(*) FROM locks").fetchone()[0]
+        return snap
+
+
+# secrets の [shared_cache] path を設定した場合のみ有効 (未設定なら None)
+@st.cache_resource
+def get_shared_cache():
+    conf = st.secrets.get("shared_cache", {})
+    if not conf.get("path"):
+        return None
+    return SharedCache(
+        conf["path"],
+        ttl=float(conf.get("ttl", 600)),
+        max_bytes=int(conf.get("max_mb", 1024)) * 1024 * 1024,
+        lock_timeout=float(conf.get("lock_timeout", 120)),
+        journal_mode=conf.get("journal_mode", "WAL"),
+    )
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def enable_copy_on_write():
+    # 共有フレームの浅いコピーへの書き込みを元データに波及させない (pandas 3 では常に有効)
+    # pandas 全体の設定を変えるため、アプリの起動時に明示的に呼ぶ
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def arrow_frame(table):
+    # Arrow のバッファをそのまま参照する DataFrame (変換時にデータをコピーしない)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def view(frame):
+    # 呼び出し側には浅いコピーを渡す。データは共有し、書き込まれた列だけがその時にコピーされる
+    # (Copy-on-Write 前提。pandas 3 未満では起動時に enable_copy_on_write() を呼ぶこと)
+    return frame.copy(deep=False)
+
+
+class FrameStore:
+    """Arrow テーブルから作った DataFrame をキーごとに1つだけ保持し、全セッションで共有する
+
+    テーブルが差し替わった (再取得された) キーは次の get で作り直す。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        self.stats = {"hits": 0, "builds": 0}
+
+    def get(self, key, table):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None and entry[0] is table:
+                self._frames.move_to_end(key)
+                self.stats["hits"] += 1
+                return view(entry[1])
+        frame = arrow_frame(table)
+        with self._lock:
+            self._frames[key] = (table, frame)
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+            self.stats["builds"] += 1
+        return view(frame)
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._frames)}
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+import snowflake.connector
+from snowflake.connector.errors import InterfaceError, OperationalError
+
+import query_trace
+from query_control import get_query_control
+
+logger = logging.getLogger(__name__)
+
+# 再接続で回復できるエラー (SQLの構文エラー等はリトライしない)
+RETRYABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class PoolStats:
+    """プールの動作カウンター (サイドバーで確認用)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.leases = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.pings = 0
+        self.ping_skips = 0
+        self.retries = 0
+        self.discards = 0
+        self._connect_times = deque()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+            if name == "connects":
+                self._connect_times.append(time.monotonic())
+
+    def logins_per_minute(self):
+        cutoff = time.monotonic() - 60
+        with self._lock:
+            while self._connect_times and self._connect_times[0] < cutoff:
+                self._connect_times.popleft()
+            return len(self._connect_times)
+
+    def snapshot(self):
+        with self._lock:
+            snap = {
+                "leases": self.leases,
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+                "pings": self.pings,
+                "ping_skips": self.ping_skips,
+                "retries": self.retries,
+                "discards": self.discards,
+            }
+        snap["logins_per_minute"] = self.logins_per_minute()
+        return snap
+
+
+class ConnectionPool:
+    """Snowflake接続のプール
+
+    - size: 同時に保持する接続の上限
+    - idle_check: この秒数以上使われていない接続だけ貸出前に SELECT 1 で確認する
+    - max_retries / backoff: 接続系エラー時のリトライ回数と待ち時間 (指数バックオフ)
+    """
+
+    def __init__(self, connect, size=4, idle_check=300.0, max_retries=3,
+                 backoff=0.5, lease_timeout=30.0):
+        self._connect = connect
+        self.size = size
+        self.idle_check = idle_check
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.lease_timeout = lease_timeout
+        self.stats = PoolStats()
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self):
+        with query_trace.span("connect"):
+            conn = self._connect()
+        self.stats.incr("connects")
+        return conn
+
+    def _is_alive(self, conn, last_used):
+        if conn.is_closed():
+            return False
+        if time.monotonic() - last_used < self.idle_check:
+            self.stats.incr("ping_skips")
+            return True
+        # 長時間アイドルだった接続のみ疎通確認
+        self.stats.incr("pings")
+        try:
+            with query_trace.span("connect"):
+                conn.cursor().execute("SELECT 1").close()
+            return True
+        except RETRYABLE_ERRORS as e:
+            logger.info("idle connection failed liveness check: %s", e)
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if self._is_alive(conn, last_used):
+                return conn
+            self._discard(conn)
+            self.stats.incr("reconnects")
+        return self._new_connection()
+
+    def _discard(self, conn):
+        self.stats.incr("discards")
+        try:
+            conn.close()
+        except Exception as e:
+            # 切断済みの接続は close に失敗しても破棄するだけ
+            logger.debug("close failed on discarded connection: %s", e)
+
+    @contextmanager
+    def lease(self):
+        # 接続を借りて、終わったらプールに返却する (close しない)
+        if not self._slots.acquire(timeout=self.lease_timeout):
+            raise PoolExhausted(f"{self.lease_timeout}秒以内に接続を確保できませんでした。")
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            self.stats.incr("leases")
+            yield conn
+        except RETRYABLE_ERRORS:
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                if broken or conn.is_closed():
+                    self._discard(conn)
+                else:
+                    with self._lock:
+                        self._idle.append((conn, time.monotonic()))
+            self._slots.release()
+
+    def run(self, fn):
+        # fn(conn) を実行し、接続系エラーのときだけバックオフ付きでリトライ
+        attempt = 0
+        while True:
+            try:
+                with self.lease() as conn:
+                    return fn(conn)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning("retrying after connection error (attempt %d): %s", attempt + 1, e)
+                self.stats.incr("retries")
+                query_trace.increment("retries")
+                self.stats.incr("reconnects")
+                time.sleep(self.backoff * (2 ** attempt))
+                attempt += 1
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+@st.cache_resource
+def get_pool():
+    conf = st.secrets["snowflake"]
+    # クエリの中止・タイムアウトの設定 ([query_control]) を倉庫側のセッションにも反映
+    session_parameters = get_query_control().session_parameters()
+
+    def connect():
+        return snowflake.connector.connect(
+            user=conf["user"],
+            password=conf["password"],
+            account=conf["account"],
+            warehouse=conf["warehouse"],
+            database=conf["database"],
+            schema=conf["schema"],
+            client_session_keep_alive=True,
+            session_parameters=session_parameters,
+        )
+
+    return ConnectionPool(
+        connect,
+        size=int(conf.get("pool_size", 4)),
+        idle_check=float(conf.get("pool_idle_check", 300)),
+        max_retries=int(conf.get("pool_max_retries", 3)),
+    )
@@ -0,0 +1,111 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStream:
+    """バックグラウンドで取得中の結果 (RecordBatch の列)
+
+    複数の読み手が順に読める。ストリームが保持するのは直近 window 個のバッチだけで、
+    遅れた読み手は保持している最も古いバッチから読む (途中表示用のため欠けてもよい)。
+    全件の結果は取得側が組み立て、完了時に result に入る。
+    """
+
+    def __init__(self, key, window=8):
+        self.key = key
+        self.window = window
+        self.rows = 0
+        self.done = False
+        self.error = None
+        self.result = None
+        self._batches = deque()
+        self._first = 0  # self._batches[0] の通し番号
+        self._cond = threading.Condition()
+
+    def _append(self, batch):
+        with self._cond:
+            self._batches.append(batch)
+            if len(self._batches) > self.window:
+                self._batches.popleft()
+                self._first += 1
+            self.rows += batch.num_rows
+            self._cond.notify_all()
+
+    def _finish(self, result=None, error=None):
+        with self._cond:
+            self.done = True
+            self.result = result
+            self.error = error
+            self._batches.clear()
+            self._cond.notify_all()
+
+    def batches(self, poll=None):
+        # 次のバッチが届くまで待ちながら順に返す。取得が失敗した場合は例外を送出する
+        # poll 秒たっても次のバッチが届かなければ None を返す (読み手が中断を確認するため)
+        index = 0
+        while True:
+            with self._cond:
+                def ready():
+                    return index < self._first + len(self._batches) or self.done
+                if not ready():
+                    self._cond.wait_for(ready, timeout=poll)
+                index = max(index, self._first)
+                if index < self._first + len(self._batches):
+                    batch = self._batches[index - self._first]
+                    index += 1
+                elif self.error is not None:
+                    raise self.error
+                elif self.done:
+                    return
+                else:
+                    batch = None
+            yield batch
+
+
+class StreamRegistry:
+    """キーごとの取得を1本にまとめ、バックグラウンドでバッチを流し込む
+
+    produce() はバッチのイテレータを返すこと。全件がそろったらバッチを結合せずに
+    テーブルにまとめ、on_complete(table) を呼んでからストリームを完了にする
+    (キャッシュへの登録用)。
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stream")
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def open(self, key, produce, on_complete):
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = BatchStream(key)
+                self._streams[key] = stream
+                self._executor.submit(self._run, stream, produce, on_complete)
+        return stream
+
+    def _run(self, stream, produce, on_complete):
+        try:
+            batches = []
+            for batch in produce():
+                batches.append(batch)
+                stream._append(batch)
+            table = pa.Table.from_batches(batches)
+            on_complete(table)
+        except Exception as e:
+            logger.exception("stream failed for %s", stream.key)
+            stream._finish(error=e)
+        else:
+            stream._finish(table)
+        finally:
+            with self._lock:
+                self._streams.pop(stream.key, None)
+
+    def active(self):
+        with self._lock:
+            return {key: stream.rows for key, stream in self._streams.items()}
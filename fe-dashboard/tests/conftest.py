@@ -0,0 +1,5 @@
+import os
+import sys
+
+# テスト対象のモジュール (fe-dashboard 直下) を import できるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_reduce
+
+
+def random_walk(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.cumsum(rng.normal(size=rows))
+    y[rng.integers(0, rows)] += 500  # 1点だけのスパイク
+    y[rng.integers(0, rows)] -= 500
+    return y
+
+
+def test_minmax_keeps_extrema_and_ends():
+    y = random_walk(100_000)
+    kept = chart_reduce.minmax_indices(y, 500)
+    assert len(kept) <= 500
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert y[kept].max() == y.max() and y[kept].min() == y.min()
+    assert (np.diff(kept) > 0).all()
+
+
+def test_minmax_skips_missing_values():
+    y = random_walk(10_000)
+    y[::7] = np.nan
+    kept = chart_reduce.minmax_indices(y, 200)
+    assert len(kept) <= 200
+    assert not np.isnan(y[kept]).any()
+    assert y[kept].max() == np.nanmax(y) and y[kept].min() == np.nanmin(y)
+
+
+def test_lttb_keeps_ends_within_target():
+    x = np.arange(50_000)
+    y = random_walk(len(x))
+    kept = chart_reduce.lttb_indices(x, y, 300)
+    assert len(kept) <= 300
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+
+
+def test_small_input_is_unchanged():
+    series = pd.Series([3.0, 1.0, 2.0])
+    assert chart_reduce.reduce_series(series, target=10) is series
+
+
+@pytest.mark.parametrize("groups", [4, 40])
+def test_reduce_frame_keeps_extrema_per_group(groups):
+    rows = 20_000
+    df = pd.DataFrame({
+        "x": np.tile(np.arange(rows // groups), groups),
+        "y": random_walk(rows // groups * groups),
+        "team": np.repeat([f"T{i}" for i in range(groups)], rows // groups),
+    })
+    reduced = chart_reduce.reduce_frame(df, "x", "y", target=1000, by="team")
+    assert len(reduced) <= 1000
+    assert reduced.index.is_monotonic_increasing
+    for team, part in df.groupby("team"):
+        kept = reduced[reduced["team"] == team]
+        assert kept["y"].max() == part["y"].max() and kept["y"].min() == part["y"].min()
+
+
+def test_reduce_frame_with_many_groups_stays_within_target():
+    # グループ数 × 4 が target を超える場合も target 点以内
+    rows = 50_000
+    df = pd.DataFrame({"x": np.arange(rows), "y": random_walk(rows), "team": np.arange(rows) % 600})
+    reduced = chart_reduce.reduce_frame(df, "x", "y", target=2000, by="team")
+    assert len(reduced) <= 2000
+    assert reduced["y"].max() == df["y"].max() and reduced["y"].min() == df["y"].min()
+
+
+def test_reduce_series_arrow_backed():
+    y = random_walk(30_000)
+    series = pd.Series(pd.array(y, dtype="double[pyarrow]"), index=pd.RangeIndex(len(y)))
+    reduced = chart_reduce.reduce_series(series, target=400)
+    assert len(reduced) <= 400
+    assert reduced.max() == y.max() and reduced.min() == y.min()
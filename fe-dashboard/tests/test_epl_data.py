@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+import epl_aggregate
+import epl_data
+
+# bench/bench_epl_memory.py も scaled_seasons と check_same_results をここから使う
+SELECTED_TEAMS = ["Manchester City", "Chelsea", "Arsenal"]
+
+
+def scaled_seasons(scale):
+    # シーズン名をずらして行数を scale 倍にした合成データ
+    raw = pd.DataFrame(epl_data.SEASON_DATA)
+    frames = []
+    for i in range(scale):
+        part = raw.copy()
+        start = part["シーズン"].str[:4].astype(int) + 23 * i
+        part["シーズン"] = start.astype(str) + "-" + ((start + 1) % 100).astype(str).str.zfill(2)
+        frames.append(part)
+    return pd.concat(frames, ignore_index=True)
+
+
+def raw_leaderboard(df, by, value, columns):
+    # epl_aggregate と同じ表を文字列の列のまま素直に集計する (並びは名前順)
+    stats = df.groupby(by)[value].agg(["sum", "mean", "count"]).round(1)
+    stats.columns = columns
+    return stats
+
+
+def check_same_results(raw, compact):
+    # 型変換の前後でフィルタ・集計結果が変わらないこと
+    seasons = raw["シーズン"].tolist()[::2]
+    mask_raw = raw["シーズン"].isin(seasons) & raw["優勝チーム"].isin(SELECTED_TEAMS)
+    mask_compact = compact["シーズン"].isin(seasons) & compact["優勝チーム"].isin(SELECTED_TEAMS)
+    f_raw, f_compact = raw[mask_raw], compact[mask_compact]
+    assert_frame_equal(
+        f_raw.reset_index(drop=True),
+        f_compact.reset_index(drop=True).astype(f_raw.dtypes.to_dict()),
+    )
+    expected = f_raw.groupby("優勝チーム").size()
+    actual = f_compact.groupby("優勝チーム", observed=True).size()
+    actual.index = actual.index.astype(str)
+    assert_series_equal(expected, actual, check_names=False, check_index_type=False)
+    for key, value in (("得点王", "得点王ゴール数"), ("クリーンシート王", "クリーンシート数")):
+        expected = f_raw.groupby(key)[value].agg(["sum", "mean", "count"])
+        actual = f_compact.groupby(key, observed=True)[value].agg(["sum", "mean", "count"])
+        actual.index = actual.index.astype(str)
+        assert_frame_equal(expected, actual.astype(expected.dtypes.to_dict()), check_names=False,
+                           check_index_type=False)
+
+
+def test_compact_season_frame_dtypes():
+    df = epl_data.compact_season_frame(pd.DataFrame(epl_data.SEASON_DATA))
+    for col in epl_data.SEASON_CATEGORY_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    assert df["シーズン"].cat.ordered
+    assert df["シーズン"].min() == "2000-01"
+    assert df.index.dtype == "int32"
+    assert df.index[0] == 2022
+    for col, dtype in {"勝ち点": "int8", "得点": "int8", "失点": "int8", "得点王ゴール数": "int8",
+                       "アシスト数": "int8", "クリーンシート数": "int8", "平均観客数": "int32"}.items():
+        assert df[col].dtype == dtype, col
+
+
+def test_compact_team_frame_dtypes():
+    df = epl_data.compact_team_frame(pd.DataFrame(epl_data.TEAM_STATS))
+    assert isinstance(df["チーム"].dtype, pd.CategoricalDtype)
+    for col, dtype in {"総得点": "int16", "総失点": "int16", "平均勝ち点": "float32",
+                       "最高順位": "int8", "最低順位": "int8"}.items():
+        assert df[col].dtype == dtype, col
+
+
+def test_compact_frames_keep_values():
+    raw = pd.DataFrame(epl_data.SEASON_DATA)
+    compact = epl_data.compact_season_frame(raw)
+    pd.testing.assert_frame_equal(compact.reset_index(drop=True).astype(raw.dtypes.to_dict()), raw)
+    raw = pd.DataFrame(epl_data.TEAM_STATS)
+    compact = epl_data.compact_team_frame(raw)
+    pd.testing.assert_frame_equal(compact.astype(raw.dtypes.to_dict()), raw, check_exact=False, rtol=1e-6)
+
+
+@pytest.mark.parametrize("scale, bound", [(1, 1.0), (1000, 0.45)])
+def test_compact_season_frame_memory(scale, bound):
+    # 行数が多いほど名前のカテゴリ化が効く (23,000 行で元の約4割)
+    raw = scaled_seasons(scale)
+    before = epl_data.frame_memory(raw)
+    after = epl_data.frame_memory(epl_data.compact_season_frame(raw))
+    assert after <= before * bound
+
+
+@pytest.mark.parametrize("scale", [1, 50])
+def test_compact_season_frame_same_results(scale):
+    raw = scaled_seasons(scale)
+    check_same_results(raw, epl_data.compact_season_frame(raw))
+
+
+SELECTIONS = [
+    (lambda seasons: seasons, SELECTED_TEAMS),
+    (lambda seasons: seasons[::3], SELECTED_TEAMS + ["Leicester City"]),
+    (lambda seasons: seasons[:5], ["Manchester United"]),
+    (lambda seasons: seasons, ["存在しないチーム"]),
+    (lambda seasons: [], SELECTED_TEAMS),
+]
+
+
+@pytest.mark.parametrize("pick_seasons, teams", SELECTIONS)
+def test_filter_index_matches_isin(pick_seasons, teams):
+    raw = scaled_seasons(3)
+    compact = epl_data.compact_season_frame(raw)
+    index = epl_data.FilterIndex(compact)
+    seasons = pick_seasons(raw["シーズン"].tolist())
+    mask = raw["シーズン"].isin(seasons) & raw["優勝チーム"].isin(teams)
+    rows = index.rows(seasons, teams)
+    np.testing.assert_array_equal(rows, np.flatnonzero(mask.to_numpy()))
+    # 同じ選択はメモ化された結果を返す
+    assert index.rows(list(reversed(seasons)), teams) is rows
+
+    result = epl_aggregate.aggregate(compact.iloc[rows])
+    filtered = raw[mask]
+    for name, by, value, columns in (
+        ("scorers", "得点王", "得点王ゴール数", epl_aggregate.SCORER_COLUMNS),
+        ("keepers", "クリーンシート王", "クリーンシート数", epl_aggregate.KEEPER_COLUMNS),
+    ):
+        actual = result[name]
+        # 1列目 (合計) の降順に並んでいること。同値の順は問わないので名前順にそろえて比べる
+        assert actual[columns[0]].is_monotonic_decreasing, name
+        actual = actual.set_axis(actual.index.astype(str)).sort_index()
+        expected = raw_leaderboard(filtered, by, value, columns)
+        assert_frame_equal(expected, actual.astype(expected.dtypes.to_dict()), check_names=False,
+                           check_index_type=False)
@@ -0,0 +1,52 @@
+import time
+
+import pyarrow as pa
+
+from refresher import Refresher
+from result_cache import ResultCache
+from shared_cache import SharedCache
+
+TTL = 600
+
+
+def old_disk_entry(tmp_path, age):
+    disk = ResultCache(str(tmp_path), ttl=TTL)
+    disk.put("k", pa.table({"x": [1]}), created=time.time() - age)
+    return disk
+
+
+def test_disk_entry_keeps_its_age(tmp_path):
+    disk = old_disk_entry(tmp_path, 590)
+    table, created = disk.get("k", with_created=True)
+    assert 585 < time.time() - created < 595
+    refresher = Refresher(lambda refresh=False: (table, time.time()), ttl=TTL)
+    refresher.put("k", table, created)
+    refresher.get("k")
+    # ディスクで 590 秒経った結果は新しい結果として扱わない
+    assert refresher.stats["stale"] == 1 and refresher.stats["fresh"] == 0
+
+
+def test_loader_age_counts_toward_max_stale(tmp_path):
+    disk = old_disk_entry(tmp_path, 590)
+    loads = []
+
+    def load(refresh=False):
+        loads.append(refresh)
+        if not refresh:
+            return disk.get("k", with_created=True)
+        return pa.table({"x": [2]}), time.time()
+
+    refresher = Refresher(load, ttl=TTL, max_stale=300)
+    assert refresher.get("k")["x"][0].as_py() == 1
+    # 最初の取得で読んだ結果がすでに max_stale を超えているので、次は再取得を待つ
+    assert refresher.get("k")["x"][0].as_py() == 2
+    assert loads == [False, True] and refresher.stats["expired"] == 1
+
+
+def test_shared_cache_returns_created(tmp_path):
+    shared = SharedCache(str(tmp_path / "shared.sqlite"), ttl=TTL)
+    before = time.time()
+    table, created = shared.get_or_load("k", "select 1", lambda: pa.table({"x": [1]}), with_created=True)
+    assert before <= created <= time.time()
+    assert shared.get("k", with_created=True)[1] == created
+    assert shared.get("k")["x"][0].as_py() == 1